@@ -1,8 +1,12 @@
+import logging
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from music_engine import MusicMLEngine
+from engine_registry import EngineRegistry, SessionEngine
+from music_engine import display_titles
+from training_jobs import TrainingJobManager
 
 # --- 1. CONFIG & SETUP ---
 st.set_page_config(
@@ -12,14 +16,82 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Registry engine bersama (satu per proses): sesi dengan dataset yang sama
+# memakai engine terlatih yang sama, salinan privat hanya dibuat saat data diubah
+@st.cache_resource
+def get_engine_registry():
+    return EngineRegistry()
+
+# Metrik engine ditulis sebagai baris JSON ke stderr (dikumpulkan log shipper)
+@st.cache_resource
+def setup_engine_logging():
+    engine_logger = logging.getLogger("music_engine")
+    if not engine_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        engine_logger.addHandler(handler)
+        engine_logger.setLevel(logging.INFO)
+        engine_logger.propagate = False
+    return engine_logger
+
+setup_engine_logging()
+
+# Training & k-sweep berjalan di thread latar; halaman mem-poll progress lewat rerun
+@st.cache_resource
+def get_job_manager():
+    return TrainingJobManager()
+
 # Initialize Session State
 if 'engine' not in st.session_state:
-    st.session_state.engine = MusicMLEngine()
+    st.session_state.engine = SessionEngine(get_engine_registry())
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "Home"
 
 engine = st.session_state.engine
 COLORS = engine.COLORS
+CRITERION_LABELS = {
+    "silhouette": "Silhouette Score",
+    "calinski_harabasz": "Calinski-Harabasz",
+    "inertia": "Inertia (Elbow)"
+}
+MODEL_DIR = "models/latest"
+# Peta persebaran: di atas batas ini pakai WebGL / density + sampel
+SCATTER_WEBGL_THRESHOLD = 20_000
+SCATTER_DENSITY_THRESHOLD = 100_000
+ALGORITHM_OPTIONS = {
+    "K-Means (Exact)": "kmeans",
+    "Histogram K-Means (Cepat)": "histogram"
+}
+JOB_POLL_SECONDS = 0.5
+# Judul hanya dibentuk untuk lagu yang ditampilkan di pilihan detail
+SONG_SELECT_LIMIT = 1_000
+PROFILE_METHODS = ["process_data_clustering", "recommend_clusters", "load_data",
+                   "search_songs", "get_filtered_data", "append_songs"]
+jobs = get_job_manager()
+poll_jobs = False
+
+def track_job(job_key):
+    """
+    Tampilkan progress job latar yang id-nya disimpan di session_state[job_key].
+    Mengembalikan status akhir sekali saat job selesai (lalu job dilupakan), selain itu None.
+    """
+    global poll_jobs
+    job_id = st.session_state.get(job_key)
+    status = jobs.status(job_id) if job_id is not None else None
+    if status is None:
+        st.session_state.pop(job_key, None)
+        return None
+    if status["state"] in ("done", "failed", "cancelled"):
+        jobs.forget(job_id)
+        del st.session_state[job_key]
+        return status
+    st.progress(status["fraction"], text=f"{status['label']}: {status['stage']} ({status['elapsed']:.0f} dtk)")
+    if status["cancel_requested"]:
+        st.caption("Menghentikan proses...")
+    elif st.button("⏹️ Batalkan", key=f"cancel_{job_key}"):
+        jobs.cancel(job_id)
+    poll_jobs = True
+    return None
 
 # Load CSS Helper
 def load_css(file_name):
@@ -58,12 +130,63 @@ with st.sidebar:
     st.markdown("---")
     # Data Status Indicator
     if engine.processed_data is not None:
-        count = len(engine.processed_data)
-        method = engine.processed_data['method'].iloc[0]
+        summary = engine.get_summary()
+        count = summary['total']
+        method = summary['method']
         st.success(f"✅ Data Siap\n\n🎵 {count} Lagu\n⚙️ {method}")
+        if engine.is_shared:
+            registry_info = get_engine_registry().get_info()
+            st.caption(f"🔗 Engine bersama · {registry_info['entries']} model di memori "
+                       f"({registry_info['memory_mb']:.0f} MB)")
     else:
         st.info("Menunggu data...")
 
+    with st.expander("🩺 Diagnostik Engine"):
+        metrics = engine.get_metrics()
+        track_memory = st.toggle("Ukur memori per tahap", value=metrics["track_memory"],
+                                 help="Memakai tracemalloc; proses menjadi lebih lambat.")
+        if track_memory != metrics["track_memory"]:
+            engine.set_memory_tracking(track_memory)
+
+        if metrics["methods"]:
+            st.dataframe(pd.DataFrame([
+                {"Method": name, "Panggilan": m["count"], "Error": m["errors"],
+                 "Rata-rata (ms)": m["mean_s"] * 1000, "Maks (ms)": m["max_s"] * 1000}
+                for name, m in metrics["methods"].items()
+            ]), hide_index=True, use_container_width=True)
+
+            diag_method = st.selectbox("Detail method", list(metrics["methods"]), key="diag_method")
+            detail = metrics["methods"][diag_method]
+            fig_hist = px.bar(x=list(detail["histogram"]), y=list(detail["histogram"].values()),
+                              labels={"x": "Latensi", "y": "Panggilan"})
+            fig_hist.update_layout(height=200, margin=dict(l=0, r=0, t=10, b=0),
+                                   paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+            st.plotly_chart(fig_hist, use_container_width=True)
+
+            last_call = next((r for r in reversed(metrics["recent"]) if r["method"] == diag_method), None)
+            if last_call is not None and last_call["stages"]:
+                peak = f" · puncak {last_call['peak_mb']:.1f} MB" if last_call["peak_mb"] is not None else ""
+                st.caption(f"Panggilan terakhir: {last_call['seconds'] * 1000:.0f} ms{peak}")
+                stages_df = pd.DataFrame(last_call["stages"])
+                stages_df["seconds"] *= 1000
+                st.dataframe(stages_df.rename(columns={"stage": "Tahap", "seconds": "ms", "peak_mb": "Puncak MB"}),
+                             hide_index=True, use_container_width=True)
+        else:
+            st.caption("Belum ada panggilan engine.")
+
+        profile_method = st.selectbox("Profil panggilan berikutnya", PROFILE_METHODS, key="profile_method")
+        if st.button("🔬 Rekam cProfile", use_container_width=True):
+            engine.profile_next_call(profile_method)
+            st.rerun()
+        if metrics["profile_pending"]:
+            st.caption(f"Menunggu panggilan {metrics['profile_pending']}...")
+        if metrics["last_profile"] is not None:
+            st.caption(f"Profil terakhir: {metrics['last_profile']['method']}")
+            st.code(metrics["last_profile"]["stats"], language=None)
+        if st.button("Reset metrik", use_container_width=True):
+            engine.reset_metrics()
+            st.rerun()
+
 # --- 3. PAGE ROUTING & CONTENT ---
 
 # === HOME PAGE ===
@@ -128,12 +251,49 @@ elif st.session_state.current_page == "Input Dataset":
         st.markdown('<div class="upload-section">', unsafe_allow_html=True)
         uploaded_file = st.file_uploader("Drop CSV file here", type=['csv'], label_visibility="collapsed")
         st.markdown('</div>', unsafe_allow_html=True)
+
+        with st.expander("⚙️ Opsi Memuat Data (Dataset Besar)"):
+            low_memory = st.checkbox("Mode hemat memori", help="Hanya membaca kolom yang dipakai, fitur audio float32, artist/genre kategori.")
+            extra_cols = st.text_input("Kolom tambahan (pisahkan dengan koma)", disabled=not low_memory)
+            max_rows = st.number_input("Batas baris (0 = tanpa batas)", min_value=0, step=100_000, disabled=not low_memory)
+            max_memory_mb = st.number_input("Batas memori MB (0 = tanpa batas)", min_value=0, step=256, disabled=not low_memory)
         
-        if uploaded_file:
-            res = engine.load_data(uploaded_file)
+        if uploaded_file is None:
+            st.session_state.pop("upload_key", None)
+            st.session_state.pop("upload_result", None)
+        else:
+            # load_data hanya saat file/opsi berubah: rerun biasa tidak boleh menimpa model
+            # yang dimuat lewat "Muat Model" dengan data upload yang masih ada di uploader
+            upload_key = (uploaded_file.file_id, low_memory, extra_cols, int(max_rows), int(max_memory_mb))
+            if st.session_state.get("upload_key") != upload_key:
+                if low_memory:
+                    res = engine.load_data(
+                        uploaded_file, low_memory=True,
+                        columns=[c.strip() for c in extra_cols.split(",") if c.strip()],
+                        max_rows=int(max_rows) or None, max_memory_mb=int(max_memory_mb) or None
+                    )
+                else:
+                    res = engine.load_data(uploaded_file)
+                st.session_state.upload_key = upload_key
+                st.session_state.upload_result = res
+        res = st.session_state.get("upload_result")
+        if res is not None:
             if res["success"]:
                 st.success(res["message"])
-                engine.recommend_clusters()
+                mem_info = f"💾 Memori data: {res['memory_mb']:.1f} MB"
+                if "peak_memory_mb" in res:
+                    mem_info += f" · puncak saat load: {res['peak_memory_mb']:.1f} MB"
+                st.caption(mem_info)
+                if engine.cluster_metrics is None and "sweep_job" not in st.session_state:
+                    st.session_state.sweep_job = jobs.submit(engine.recommend_clusters, label="Rekomendasi k")
+                sweep = track_job("sweep_job")
+                if sweep is not None and sweep["state"] == "failed":
+                    st.error(f"Rekomendasi k gagal: {sweep['error']}")
+                # Upload ulang & sesi lain dilayani registry engine bersama, bukan cache per engine
+                cache = get_engine_registry().get_info()
+                st.caption(f"⚡ Cache dataset: {cache['hits']} hit / {cache['misses']} miss "
+                           f"({cache['entries']} engine tersimpan, {cache['memory_mb']:.0f}/"
+                           f"{cache['max_memory_mb']:.0f} MB)")
             else:
                 st.error(res["message"])
 
@@ -149,6 +309,18 @@ elif st.session_state.current_page == "Input Dataset":
                 * `artist`, `song`, `genre`
             """)
 
+        with st.container(border=True):
+            st.markdown("#### 📦 Model Tersimpan")
+            model_dir = st.text_input("Folder model", value=MODEL_DIR, key="load_model_dir")
+            if st.button("Muat Model", use_container_width=True):
+                res = engine.load_model(model_dir)
+                if res["success"]:
+                    # Data upload lama tidak lagi aktif (tapi juga tidak dimuat ulang saat rerun)
+                    st.session_state.upload_result = None
+                    st.success(res["message"])
+                else:
+                    st.error(res["message"])
+
     # Data Preview Section
     if engine.raw_data is not None:
         st.markdown("### 📝 Preview Data Mentah")
@@ -180,8 +352,11 @@ elif st.session_state.current_page == "Pemrosesan Data":
         with c1:
             with st.container(border=True):
                 st.markdown("#### 💡 Rekomendasi Sistem")
+                if "sweep_job" in st.session_state:
+                    track_job("sweep_job")
                 best_k = engine.cluster_metrics['best_k'] if engine.cluster_metrics else 4
-                st.metric("Jumlah Cluster Optimal", f"{best_k}", "Silhouette Score")
+                criterion = engine.cluster_metrics['criterion'] if engine.cluster_metrics else "silhouette"
+                st.metric("Jumlah Cluster Optimal", f"{best_k}", CRITERION_LABELS[criterion])
                 st.caption("Sistem menyarankan jumlah ini berdasarkan pola data.")
 
         with c2:
@@ -189,30 +364,48 @@ elif st.session_state.current_page == "Pemrosesan Data":
                 st.markdown("#### ⚙️ Parameter Proses")
                 n_clusters = st.slider("Jumlah Kelompok (Cluster)", 2, 6, best_k)
                 st.caption("Menentukan berapa banyak variasi mood yang ingin dibentuk.")
+                algo_label = st.radio("Engine Clustering", list(ALGORITHM_OPTIONS), horizontal=True)
+                algorithm = ALGORITHM_OPTIONS[algo_label]
                 
-                if st.button("🚀 Jalankan Analisis (Train Model)", type="primary", use_container_width=True):
-                    with st.spinner("Sedang memproses data..."):
-                        status = engine.process_data_clustering(n_clusters)
-                        if status == "Sukses":
-                            st.balloons()
-                            st.success("Analisis Selesai! Model telah dilatih.")
-                        else:
-                            st.error(status)
+                training = "train_job" in st.session_state
+                if st.button("🚀 Jalankan Analisis (Train Model)", type="primary", use_container_width=True,
+                             disabled=training):
+                    st.session_state.train_job = jobs.submit(
+                        engine.process_data_clustering, n_clusters, algorithm=algorithm, label=f"Training k={n_clusters}"
+                    )
+                job = track_job("train_job")
+                if job is not None:
+                    if job["state"] == "done" and job["result"] == "Sukses":
+                        st.balloons()
+                        st.success(f"Analisis Selesai! Model telah dilatih ({job['elapsed']:.1f} dtk).")
+                        if engine.reused_sweep_fit:
+                            st.caption("♻️ Model untuk k ini dipakai ulang dari hasil rekomendasi (tanpa training ulang).")
+                    elif job["state"] == "cancelled":
+                        st.warning("Training dibatalkan. Model sebelumnya tetap dipakai.")
+                    else:
+                        st.error(job["error"] or job["result"])
 
         # Transparency Section
         if engine.processed_data is not None:
             st.markdown("### 🔍 Transparansi Proses")
-            tab1, tab2 = st.tabs(["📊 Evaluasi Model", "📍 Logika Pembagian"])
+            tab1, tab2, tab3 = st.tabs(["📊 Evaluasi Model", "📍 Logika Pembagian", "⚖️ Akurasi Engine"])
             
             with tab1:
-                st.markdown("**Analisis Skor Silhouette** (Semakin tinggi semakin baik pemisahannya)")
                 if engine.cluster_metrics:
+                    criterion = engine.cluster_metrics['criterion']
+                    if criterion == "inertia":
+                        st.markdown("**Analisis Inertia** (Pilih titik 'siku' pada kurva)")
+                    else:
+                        st.markdown(f"**Analisis {CRITERION_LABELS[criterion]}** (Semakin tinggi semakin baik pemisahannya)")
                     scores = engine.cluster_metrics['scores']
                     score_df = pd.DataFrame(list(scores.items()), columns=['Jumlah Cluster', 'Score'])
                     fig = px.bar(score_df, x='Jumlah Cluster', y='Score', color='Score', 
                                color_continuous_scale='Viridis')
                     fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
                     st.plotly_chart(fig, use_container_width=True)
+                    timings = engine.cluster_metrics['timings']
+                    st.caption("⏱️ Waktu per k: " + ", ".join(f"k={k}: {t:.2f}s" for k, t in timings.items())
+                               + f" (mode {engine.cluster_metrics['params']['mode']})")
             
             with tab2:
                 st.markdown("**Titik Pusat (Centroid) Cluster**")
@@ -220,8 +413,37 @@ elif st.session_state.current_page == "Pemrosesan Data":
                     centroids_df = pd.DataFrame(engine.centroids, columns=['Valence (Positifitas)', 'Energy (Intensitas)'])
                     centroids_df.index.name = 'Cluster ID'
                     st.dataframe(centroids_df, use_container_width=True)
+
+                st.markdown("**Mood Cluster vs Mood Aturan Kuadran**")
+                agreement = engine.get_mood_agreement()
+                if agreement:
+                    st.caption(f"Kesesuaian: {agreement['agreement_rate']:.1%} lagu memiliki mood cluster yang sama dengan aturan.")
+                    st.dataframe(agreement['matrix'], use_container_width=True)
+
+            with tab3:
+                st.markdown("**Histogram K-Means vs K-Means Exact** (pada sampel data yang sama)")
+                if st.button("Bandingkan Engine"):
+                    with st.spinner("Membandingkan engine..."):
+                        report = engine.compare_clustering_engines(n_clusters)
+                    if report:
+                        r1, r2, r3 = st.columns(3)
+                        r1.metric("Adjusted Rand Index", f"{report['adjusted_rand_index']:.4f}")
+                        r2.metric("Label Sama", f"{report['label_agreement']:.2%}")
+                        r3.metric("Rasio Inertia", f"{report['inertia_ratio']:.4f}")
+                        st.caption(f"Sampel {report['n_rows']} lagu, grid {report['bins']}x{report['bins']} · "
+                                   f"geser centroid maks {report['max_centroid_shift']:.4f} (skala 0-1) · "
+                                   f"waktu exact {report['time_exact']:.2f}s vs histogram {report['time_histogram']:.2f}s")
             
             st.markdown("---")
+            c_save, c_dir = st.columns([1, 2])
+            save_dir = c_dir.text_input("Folder model", value=MODEL_DIR, key="save_model_dir", label_visibility="collapsed")
+            if c_save.button("💾 Simpan Model", use_container_width=True):
+                res = engine.save_model(save_dir)
+                if res["success"]:
+                    st.success(res["message"])
+                else:
+                    st.error(res["message"])
+
             if st.button("Lihat Hasil Visualisasi 👉", type="primary"):
                 st.session_state.current_page = "Visualisasi"
                 st.rerun()
@@ -239,13 +461,14 @@ elif st.session_state.current_page == "Visualisasi":
         """, unsafe_allow_html=True)
         
         df = engine.processed_data
+        summary = engine.get_summary()
         
         # FIXED UI: Menggunakan container border untuk Metrics agar terlihat jelas
         with st.container(border=True):
             c1, c2, c3 = st.columns(3)
-            c1.metric("Total Lagu", len(df))
-            c2.metric("Dominant Mood", df['mood'].mode()[0])
-            c3.metric("Variasi Mood", f"{df['cluster_id'].nunique()} Kelompok")
+            c1.metric("Total Lagu", summary['total'])
+            c2.metric("Dominant Mood", summary['dominant_mood'])
+            c3.metric("Variasi Mood", f"{summary['n_clusters']} Kelompok")
         
         st.markdown("---")
         
@@ -255,9 +478,38 @@ elif st.session_state.current_page == "Visualisasi":
         with col_viz:
             with st.container(border=True):
                 st.subheader("🗺️ Peta Persebaran Cluster")
-                fig = px.scatter(df, x='valence', y='energy', color='mood', 
-                               hover_data=['artist', 'song'],
-                               color_discrete_sequence=px.colors.qualitative.Pastel)
+                render_options = ["Otomatis", "Semua Titik", "Density + Sampel"]
+                if len(df) > SCATTER_DENSITY_THRESHOLD:
+                    # Semua titik + hover di katalog besar membuat payload tak terbatas
+                    render_options.remove("Semua Titik")
+                render_mode = st.radio("Mode Render", render_options,
+                                       horizontal=True, label_visibility="collapsed")
+                if render_mode == "Otomatis":
+                    render_mode = "Density + Sampel" if len(df) > SCATTER_DENSITY_THRESHOLD else "Semua Titik"
+
+                if render_mode == "Semua Titik":
+                    # WebGL untuk data menengah agar browser tetap responsif
+                    fig = px.scatter(df, x='valence', y='energy', color='mood', 
+                                   hover_data=['artist', 'song'],
+                                   color_discrete_sequence=px.colors.qualitative.Pastel,
+                                   render_mode="webgl" if len(df) > SCATTER_WEBGL_THRESHOLD else "auto")
+                else:
+                    # Density per mood (kontur) + sampel terstratifikasi: payload tetap kecil
+                    payload = engine.get_scatter_payload()
+                    palette = px.colors.qualitative.Pastel
+                    mood_colors = {m: palette[i % len(palette)] for i, m in enumerate(payload['density'])}
+                    fig = px.scatter(payload['sample'], x='valence', y='energy', color='mood',
+                                   hover_data=['artist', 'song'], color_discrete_map=mood_colors,
+                                   render_mode="webgl", opacity=0.6)
+                    centers = (payload['edges'][:-1] + payload['edges'][1:]) / 2
+                    for mood, z in payload['density'].items():
+                        fig.add_trace(go.Contour(
+                            x=centers, y=centers, z=z, showscale=False, hoverinfo='skip', name=mood,
+                            contours=dict(coloring='lines'), line=dict(width=1),
+                            colorscale=[[0, mood_colors[mood]], [1, mood_colors[mood]]], ncontours=6
+                        ))
+                    st.caption(f"Menampilkan density seluruh {payload['total']} lagu + "
+                               f"{len(payload['sample'])} sampel titik.")
                 fig.add_hline(y=0.5, line_dash="dash", line_color="gray")
                 fig.add_vline(x=0.5, line_dash="dash", line_color="gray")
                 fig.update_layout(
@@ -272,12 +524,21 @@ elif st.session_state.current_page == "Visualisasi":
         with col_pie:
             with st.container(border=True):
                 st.subheader("🥧 Proporsi")
-                counts = df['mood'].value_counts()
+                counts = summary['mood_counts']
                 fig = px.pie(values=counts.values, names=counts.index, color=counts.index, 
                              color_discrete_sequence=px.colors.qualitative.Pastel, hole=0.6)
                 fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', font=dict(color='white'), showlegend=False)
                 st.plotly_chart(fig, use_container_width=True)
 
+        with st.expander("📈 Statistik per Mood"):
+            st.markdown("**Valence & Energy per Mood** (rata-rata dan kuartil)")
+            st.dataframe(summary['mood_stats'], use_container_width=True)
+            st.markdown("**Centroid per Cluster**")
+            st.dataframe(summary['centroid_stats'], use_container_width=True)
+            if summary['genre_mood'] is not None:
+                st.markdown("**Genre x Mood**")
+                st.dataframe(summary['genre_mood'], use_container_width=True)
+
 # === SONG EXPLORER PAGE ===
 elif st.session_state.current_page == "Song Explorer":
     if engine.processed_data is None:
@@ -293,7 +554,7 @@ elif st.session_state.current_page == "Song Explorer":
         with st.container(border=True):
             c1, c2 = st.columns([3, 1])
             q = c1.text_input("🔍 Cari Judul / Artis", placeholder="Ketik nama lagu...")
-            mood_opts = ["Semua"] + list(engine.processed_data['mood'].unique())
+            mood_opts = ["Semua"] + engine.get_summary()['mood_options']
             m = c2.selectbox("Filter Mood", mood_opts)
         
         # Adjust filter param for 'Semua'
@@ -305,7 +566,10 @@ elif st.session_state.current_page == "Song Explorer":
         
         if len(res) > 0:
             st.markdown("---")
-            sel_song = st.selectbox("Pilih Lagu untuk Detail", res['display_title'].unique())
+            shown = res.head(SONG_SELECT_LIMIT)
+            sel_song = st.selectbox("Pilih Lagu untuk Detail", display_titles(shown).unique())
+            if len(res) > SONG_SELECT_LIMIT:
+                st.caption(f"Menampilkan {SONG_SELECT_LIMIT} lagu pertama; persempit pencarian untuk lagu lain.")
             data = engine.get_song_details(sel_song)
             
             if data is not None:
@@ -331,4 +595,20 @@ elif st.session_state.current_page == "Song Explorer":
                         ))
                         fig.update_layout(polar=dict(bgcolor='rgba(0,0,0,0)', radialaxis=dict(visible=True, range=[0,1])),
                                         paper_bgcolor='rgba(0,0,0,0)', font=dict(color='white'), height=300)
-                        st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+                        st.plotly_chart(fig, use_container_width=True)
+
+                st.markdown("#### 🎯 Lagu Serupa")
+                s1, s2 = st.columns([1, 3])
+                n_similar = s1.number_input("Jumlah", min_value=1, max_value=50, value=10)
+                same_mood = s2.checkbox(f"Hanya mood yang sama ({data['mood']})")
+                similar = engine.get_similar_songs(sel_song, k=int(n_similar), same_mood=same_mood)
+                if len(similar) > 0:
+                    st.dataframe(similar[['song', 'artist', 'mood', 'valence', 'energy', 'distance']],
+                                 use_container_width=True, hide_index=True)
+                else:
+                    st.caption("Tidak ada lagu serupa.")
+
+# Job latar masih berjalan: rerun berkala untuk memperbarui progress
+if poll_jobs:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
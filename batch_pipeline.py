@@ -0,0 +1,184 @@
+"""
+Pipeline batch tanpa Streamlit: muat, cari k (atau pakai k tetap), cluster, dan beri
+label mood untuk banyak CSV sekaligus secara paralel.
+
+Contoh:
+    python batch_pipeline.py data/playlists/ -o output/ --workers 8
+    python batch_pipeline.py "data/*.csv" --k 4 --algorithm histogram --format parquet
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from threadpoolctl import threadpool_limits
+
+from music_engine import HIST_BINS, MusicMLEngine
+
+OUTPUT_FORMATS = ("feather", "parquet")
+REPORT_FILE = "metrics.json"
+
+
+def find_inputs(patterns):
+    """Kumpulkan file CSV dari daftar direktori dan/atau pola glob (urut, tanpa duplikat)."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.csv")
+        paths.extend(p for p in glob.glob(pattern) if os.path.isfile(p))
+    return sorted(set(os.path.abspath(p) for p in paths))
+
+
+def _output_names(paths, fmt):
+    """Nama file output per input; nama yang sama dari direktori berbeda diberi sufiks."""
+    names, used = {}, {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        used[stem] = used.get(stem, 0) + 1
+        suffix = f"-{used[stem]}" if used[stem] > 1 else ""
+        names[path] = f"{stem}{suffix}.{fmt}"
+    return names
+
+
+def process_file(path, output_path, options):
+    """
+    Jalankan pipeline engine untuk satu CSV di dalam worker. BLAS/OpenMP dibatasi satu
+    thread agar paralelisme hanya di tingkat file (worker tidak saling berebut core).
+    """
+    start = time.perf_counter()
+    metrics = {"input": path, "output": None, "success": False}
+    with threadpool_limits(limits=1):
+        engine = MusicMLEngine(cache_size=1)
+        res = engine.load_data(path, low_memory=options["low_memory"])
+        if not res["success"]:
+            metrics["error"] = res["message"]
+            return metrics
+        metrics["rows"] = len(engine.raw_data)
+        metrics["load_time"] = time.perf_counter() - start
+
+        n_clusters = options["k"]
+        if n_clusters is None:
+            # Sweep selalu mode sampel (silhouette penuh O(n²) terlalu mahal untuk batch)
+            sweep = engine.recommend_clusters(mode="scalable", criterion=options["criterion"], n_jobs=1,
+                                              algorithm=options["algorithm"], bins=options["bins"])
+            if sweep is None:
+                metrics["error"] = "Kolom valence/energy tidak ditemukan."
+                return metrics
+            n_clusters = sweep["best_k"]
+            metrics["sweep"] = {
+                "criterion": sweep["criterion"],
+                "scores": {str(k): float(v) for k, v in sweep["scores"].items()},
+                "total_time": sweep["total_time"],
+            }
+
+        status = engine.process_data_clustering(n_clusters, algorithm=options["algorithm"], bins=options["bins"])
+        if status != "Sukses":
+            metrics["error"] = status
+            return metrics
+
+        df = engine.processed_data.reset_index(drop=True)
+        tmp_path = output_path + ".tmp"
+        if options["format"] == "parquet":
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_feather(tmp_path)
+        os.replace(tmp_path, output_path)
+
+    summary = engine.get_summary()
+    metrics.update({
+        "success": True,
+        "output": output_path,
+        "n_clusters": n_clusters,
+        "method": summary["method"],
+        "dominant_mood": summary["dominant_mood"],
+        "mood_counts": {str(k): int(v) for k, v in summary["mood_counts"].items()},
+        "centroids": engine.centroids.tolist(),
+        "elapsed": time.perf_counter() - start,
+    })
+    return metrics
+
+
+def run_batch(paths, output_dir, workers=None, k=None, criterion="silhouette", algorithm="kmeans",
+              bins=HIST_BINS, fmt="feather", low_memory=False, log=None):
+    """
+    Proses semua `paths` di process pool berisi `workers` proses (default: jumlah core)
+    dan kembalikan laporan metrik. Kegagalan satu file tidak menghentikan file lain.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    options = {"k": k, "criterion": criterion, "algorithm": algorithm, "bins": bins,
+               "format": fmt, "low_memory": low_memory}
+    names = _output_names(paths, fmt)
+
+    start = time.perf_counter()
+    results = []
+    # "spawn" agar worker bersih dari state thread BLAS/OpenMP proses induk
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(process_file, path, os.path.join(output_dir, names[path]), options): path
+                   for path in paths}
+        for future in as_completed(futures):
+            try:
+                metrics = future.result()
+            except Exception as e:
+                metrics = {"input": futures[future], "output": None, "success": False, "error": str(e)}
+            results.append(metrics)
+            if log is not None:
+                state = "OK" if metrics["success"] else f"GAGAL ({metrics.get('error')})"
+                log(f"[{len(results)}/{len(paths)}] {os.path.basename(metrics['input'])}: {state}")
+
+    wall_time = time.perf_counter() - start
+    results.sort(key=lambda m: m["input"])
+    succeeded = [m for m in results if m["success"]]
+    total_rows = sum(m["rows"] for m in succeeded)
+    return {
+        "files": len(paths),
+        "succeeded": len(succeeded),
+        "failed": len(paths) - len(succeeded),
+        "workers": workers,
+        "options": options,
+        "total_rows": total_rows,
+        "wall_time": wall_time,
+        "rows_per_second": total_rows / wall_time if wall_time else 0.0,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cluster & beri label mood banyak CSV sekaligus.")
+    parser.add_argument("inputs", nargs="+", help="Direktori berisi CSV dan/atau pola glob")
+    parser.add_argument("-o", "--output-dir", default="batch_output", help="Folder hasil (default: batch_output)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Jumlah proses worker (default: jumlah core)")
+    parser.add_argument("-k", "--k", type=int, default=None, help="Jumlah cluster tetap (default: dipilih lewat k-sweep)")
+    parser.add_argument("--criterion", default="silhouette", choices=["silhouette", "calinski_harabasz", "inertia"])
+    parser.add_argument("--algorithm", default="kmeans", choices=["kmeans", "histogram"])
+    parser.add_argument("--bins", type=int, default=HIST_BINS, help="Ukuran grid engine histogram")
+    parser.add_argument("--format", default="feather", choices=OUTPUT_FORMATS)
+    parser.add_argument("--low-memory", action="store_true", help="Muat CSV dengan mode hemat memori")
+    parser.add_argument("--report", default=None, help=f"Path laporan JSON (default: <output-dir>/{REPORT_FILE})")
+    args = parser.parse_args(argv)
+
+    paths = find_inputs(args.inputs)
+    if not paths:
+        parser.error("Tidak ada file CSV yang cocok.")
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    report = run_batch(paths, args.output_dir, workers=args.workers, k=args.k, criterion=args.criterion,
+                       algorithm=args.algorithm, bins=args.bins, fmt=args.format,
+                       low_memory=args.low_memory, log=log)
+    report_path = args.report or os.path.join(args.output_dir, REPORT_FILE)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    log(f"Selesai: {report['succeeded']}/{report['files']} file, {report['total_rows']} baris "
+        f"dalam {report['wall_time']:.1f} dtk ({report['workers']} worker). Laporan: {report_path}")
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
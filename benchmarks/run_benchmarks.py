@@ -0,0 +1,196 @@
+"""
+Benchmark method utama MusicMLEngine pada katalog sintetis berbagai ukuran.
+
+Contoh:
+    python -m benchmarks.run_benchmarks                          # 10k, 100k, 1M baris
+    python -m benchmarks.run_benchmarks --sizes 10000 --save-baseline
+    python -m benchmarks.run_benchmarks --compare                # gagal (exit 1) jika ada regresi
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from benchmarks.catalog import catalog_csv_bytes
+from music_engine import MusicMLEngine, _track_peak_memory, display_titles
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, "latest.json")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+# Regresi = lebih lambat / lebih boros dari baseline lebih dari toleransi ini
+DEFAULT_TOLERANCE = 0.25
+# Operasi di bawah batas ini terlalu singkat untuk dibandingkan secara andal
+MIN_COMPARABLE_SECONDS = 0.005
+MIN_COMPARABLE_MB = 1.0
+
+
+def _measure(fn, repeat=1):
+    """Median wall time dari `repeat` panggilan + puncak memori satu panggilan terpisah."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    with _track_peak_memory() as mem:
+        fn()
+    return statistics.median(times), mem["peak_bytes"] / 2 ** 20
+
+
+def _measure_once(fn):
+    """Untuk operasi mahal yang mengubah state: satu panggilan, waktu & memori sekaligus."""
+    with _track_peak_memory() as mem:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+    return elapsed, mem["peak_bytes"] / 2 ** 20, result
+
+
+def bench_size(n_rows, seed=42, repeat=5, log=None):
+    """Jalankan semua benchmark untuk satu ukuran katalog; kembalikan daftar hasil per operasi."""
+    content = catalog_csv_bytes(n_rows, seed)
+    results = []
+
+    def record(op, wall_time, peak_mb, runs):
+        results.append({"rows": n_rows, "op": op, "wall_time": wall_time, "peak_memory_mb": peak_mb, "repeat": runs})
+        if log is not None:
+            log(f"  {n_rows:>9,} {op:<36} {wall_time * 1000:>10.1f} ms {peak_mb:>9.1f} MB")
+
+    # Engine baru per panggilan agar cache upload tidak ikut terukur
+    for op, options in (("load_data", {}), ("load_data[low_memory]", {"low_memory": True})):
+        wall_time, peak = _measure(lambda: MusicMLEngine(cache_size=1).load_data(io.BytesIO(content), **options),
+                                   repeat)
+        record(op, wall_time, peak, repeat)
+
+    engine = MusicMLEngine(cache_size=1)
+    res = engine.load_data(io.BytesIO(content))
+    if not res["success"]:
+        raise RuntimeError(res["message"])
+
+    elapsed, peak, metrics = _measure_once(engine.recommend_clusters)
+    record(f"recommend_clusters[{metrics['params']['mode']}]", elapsed, peak, 1)
+
+    k = metrics["best_k"]
+    for algorithm in ("kmeans", "histogram"):
+        # Engine baru dari data yang sama agar hasil sweep tidak dipakai ulang
+        fresh = engine.fork()
+        fresh._sweep = None
+        elapsed, peak, _ = _measure_once(lambda: fresh.process_data_clustering(k, algorithm=algorithm))
+        record(f"process_data_clustering[{algorithm}]", elapsed, peak, 1)
+    engine = fresh
+
+    df = engine.processed_data
+    rng = np.random.default_rng(seed)
+    titles = display_titles(df.iloc[rng.integers(0, len(df), size=repeat + 1)]).tolist()
+    word = titles[0].split(" ")[0].lower()
+    genre = df["genre"].mode().iloc[0]
+    mood = engine.get_summary()["dominant_mood"]
+
+    cases = [
+        ("search_songs[word]", lambda: engine.search_songs(word)),
+        ("search_songs[title]", lambda: engine.search_songs(titles[1])),
+        ("search_songs[short]", lambda: engine.search_songs(word[:2])),
+        ("search_songs[word+mood]", lambda: engine.search_songs(word, mood)),
+        ("get_filtered_data[genre+mood]", lambda: engine.get_filtered_data(genre, mood)),
+        ("get_filtered_data[all]", lambda: engine.get_filtered_data()),
+        ("get_song_details", lambda: [engine.get_song_details(t) for t in titles]),
+    ]
+    for op, fn in cases:
+        wall_time, peak = _measure(fn, repeat)
+        record(op, wall_time, peak, repeat)
+    return results
+
+
+def environment_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Bandingkan hasil dengan baseline per (rows, op). Kembalikan daftar regresi:
+    waktu atau memori yang naik lebih dari `tolerance` (relatif).
+    """
+    base = {(r["rows"], r["op"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        b = base.get((r["rows"], r["op"]))
+        if b is None:
+            continue
+        checks = []
+        if max(r["wall_time"], b["wall_time"]) >= MIN_COMPARABLE_SECONDS:
+            checks.append(("wall_time", r["wall_time"], b["wall_time"]))
+        if max(r["peak_memory_mb"], b["peak_memory_mb"]) >= MIN_COMPARABLE_MB:
+            checks.append(("peak_memory_mb", r["peak_memory_mb"], b["peak_memory_mb"]))
+        for metric, current, previous in checks:
+            if previous > 0 and current > previous * (1 + tolerance):
+                regressions.append({"rows": r["rows"], "op": r["op"], "metric": metric,
+                                    "baseline": previous, "current": current, "ratio": current / previous})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MusicMLEngine pada katalog sintetis.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Jumlah baris katalog")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="Pengulangan untuk operasi query")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="File JSON hasil benchmark")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="File JSON baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Simpan hasil sebagai baseline baru")
+    parser.add_argument("--compare", action="store_true", help="Bandingkan dengan baseline; exit 1 jika regresi")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Toleransi regresi relatif")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    results = []
+    for n_rows in args.sizes:
+        log(f"Katalog {n_rows:,} baris (seed {args.seed})")
+        results.extend(bench_size(n_rows, args.seed, args.repeat, log))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": args.seed,
+        "environment": environment_info(),
+        "results": results,
+    }
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        log(f"Hasil disimpan ke {path}")
+
+    if not args.compare:
+        return 0
+    if not os.path.exists(args.baseline):
+        log(f"Baseline {args.baseline} tidak ditemukan; jalankan dengan --save-baseline terlebih dahulu.")
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("seed") != args.seed:
+        log("Peringatan: seed baseline berbeda, katalog tidak identik.")
+    regressions = compare(results, baseline, args.tolerance)
+    for r in regressions:
+        log(f"REGRESI {r['rows']:,} {r['op']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} "
+            f"({r['ratio']:.2f}x)")
+    log(f"{len(regressions)} regresi (toleransi {args.tolerance:.0%}).")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
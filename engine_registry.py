@@ -0,0 +1,294 @@
+import copy
+import io
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from music_engine import STATE_FILE, EngineMetrics, MusicMLEngine, dataset_key, read_upload_bytes
+
+# Batas memori default untuk engine bersama yang tidak sedang dipakai sesi mana pun
+DEFAULT_REGISTRY_BYTES = 2 * 2 ** 30
+# Status training yang selesai setelah sesi berganti dataset (hasilnya dibuang)
+STALE_TRAINING_STATUS = "Dibatalkan: dataset sesi sudah berganti selama training berjalan."
+
+
+def _engine_nbytes(engine, parent=None):
+    """
+    Perkiraan memori engine: data, cache upload, indeks, dan hasil sweep (lihat get_memory_usage).
+    Data yang dibagi dengan engine `parent` (asal fork) sudah dihitung di entri parent.
+    """
+    return engine.get_memory_usage(exclude=parent)["total"]
+
+
+class EngineRegistry:
+    """
+    Registry engine terlatih tingkat proses, dibagi oleh semua sesi Streamlit.
+    Entri dikunci dengan hash dataset (+ opsi load, k, algoritma), dihitung
+    referensinya, dan entri yang tidak dipakai dibuang (LRU) saat total memori
+    melebihi `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_REGISTRY_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> {"engine", "refs", "nbytes", "parent"}
+        self._key_locks = {}            # key -> Lock, agar satu key hanya dibangun sekali
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        # Metrik instrumentasi bersama untuk semua engine yang dibuat lewat registry
+        self.metrics = EngineMetrics()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _remeasure(self, key):
+        """
+        Perkirakan ulang memori entri `key`: indeks engine bersama (lagu serupa, filter setelah
+        load_model) dibangun saat pertama dipakai, jadi ukurannya bisa tumbuh setelah acquire.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            parent = self._entries.get(entry["parent"]) if entry is not None else None
+        if entry is None:
+            return
+        nbytes = _engine_nbytes(entry["engine"], parent["engine"] if parent is not None else None)
+        with self._lock:
+            if self._entries.get(key) is entry:
+                entry["nbytes"] = nbytes
+
+    def acquire(self, key, factory, parent=None):
+        """
+        Ambil engine bersama untuk `key` (referensi +1). Jika belum ada, `factory()`
+        dipanggil sekali untuk membangunnya; factory boleh mengembalikan None jika gagal.
+        `parent` adalah key entri asal fork engine tersebut (data mentah & sweep dibagi),
+        agar memori bersama tidak dihitung dua kali.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["refs"] += 1
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+        if entry is not None:
+            self._remeasure(key)
+            with self._lock:
+                self._evict()
+            return entry["engine"]
+
+        with self._key_lock(key):
+            # Sesi lain mungkin sudah selesai membangun key yang sama
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["refs"] += 1
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry["engine"]
+
+            engine = factory()
+            if engine is None:
+                return None
+            with self._lock:
+                parent_entry = self._entries.get(parent)
+            nbytes = _engine_nbytes(engine, parent_entry["engine"] if parent_entry is not None else None)
+            with self._lock:
+                self.stats["misses"] += 1
+                if parent_entry is None or self._entries.get(parent) is not parent_entry:
+                    parent = None
+                self._entries[key] = {"engine": engine, "refs": 1, "nbytes": nbytes, "parent": parent}
+                self._evict()
+            return engine
+
+    def release(self, key):
+        """Lepas satu referensi ke `key`; entri tetap di-cache sampai perlu dibuang."""
+        self._remeasure(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["refs"] = max(0, entry["refs"] - 1)
+                self._evict()
+
+    def lock_for(self, key):
+        """Lock per key untuk komputasi bersama pada engine yang sama (misal k-sweep)."""
+        return self._key_lock(key)
+
+    def _evict(self):
+        # Dipanggil dengan self._lock dipegang
+        total = sum(entry["nbytes"] for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry["refs"] == 0:
+                total -= entry["nbytes"]
+                del self._entries[key]
+                # Turunannya kini satu-satunya pemilik data bersama: hitung ulang penuh
+                for child in self._entries.values():
+                    if child["parent"] == key:
+                        child["parent"] = None
+                        nbytes = _engine_nbytes(child["engine"])
+                        total += nbytes - child["nbytes"]
+                        child["nbytes"] = nbytes
+                self._key_locks.pop(key, None)
+                self._key_locks.pop(("sweep",) + key, None)
+                self.stats["evictions"] += 1
+
+    def get_info(self):
+        """Ringkasan isi registry: jumlah entri, referensi aktif, memori, dan hit/miss."""
+        with self._lock:
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "active_refs": sum(entry["refs"] for entry in self._entries.values()),
+                "memory_mb": sum(entry["nbytes"] for entry in self._entries.values()) / 2 ** 20,
+                "max_memory_mb": self.max_bytes / 2 ** 20,
+            }
+
+
+def _release_held(registry, holder):
+    if holder["key"] is not None:
+        registry.release(holder["key"])
+        holder["key"] = None
+
+
+class SessionEngine:
+    """
+    View engine per sesi. Membaca dari engine bersama di EngineRegistry dan baru
+    membuat salinan privat (copy-on-write) saat sesi mengubah data, misal
+    append_songs. Atribut & method baca lain diteruskan ke engine yang aktif.
+    """
+
+    def __init__(self, registry):
+        self._registry = registry
+        self._engine = MusicMLEngine(metrics=registry.metrics)
+        self._data_key = None
+        # Naik setiap data sesi berganti (load_data/load_model/append_songs); training latar
+        # hanya memasang hasilnya jika generasi masih sama dengan saat training dimulai
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Key engine bersama yang sedang dipegang (None = engine privat); dilepas saat sesi hilang
+        self._held = {"key": None}
+        weakref.finalize(self, _release_held, registry, self._held)
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name in ("_engine", "_registry", "_held", "_data_key",
+                                                  "_generation", "_lock"):
+            raise AttributeError(name)
+        return getattr(self._engine, name)
+
+    @property
+    def is_shared(self):
+        return self._held["key"] is not None
+
+    def _attach(self, key, engine):
+        previous = self._held["key"]
+        self._engine = engine
+        self._held["key"] = key
+        if previous is not None:
+            self._registry.release(previous)
+
+    def _attach_if_current(self, key, engine, generation):
+        """Pasang hasil training hanya jika data sesi belum berganti sejak `generation`."""
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._attach(key, engine)
+            return True
+
+    def _materialize(self):
+        """Buat salinan privat sebelum engine diubah di tempat."""
+        if self.is_shared:
+            self._attach(None, copy.deepcopy(self._engine))
+
+    def load_data(self, uploaded_file, **load_options):
+        content = read_upload_bytes(uploaded_file)
+        data_key = ("data",) + dataset_key(content, **load_options)
+
+        # File & opsi sama dengan data aktif (rerun Streamlit): view tetap, termasuk hasil training
+        if data_key == self._data_key and self.raw_data is not None:
+            return {"success": True, "cached": True, **self._engine.load_stats,
+                    "message": f"Berhasil memuat {len(self.raw_data)} baris data mentah (cache)."}
+
+        result = {}
+
+        def build():
+            engine = MusicMLEngine(cache_size=1, metrics=self._registry.metrics)
+            result.update(engine.load_data(io.BytesIO(content), **load_options))
+            return engine if result["success"] else None
+
+        engine = self._registry.acquire(data_key, build)
+        if engine is None:
+            return result
+        with self._lock:
+            self._generation += 1
+            self._attach(data_key, engine)
+            self._data_key = data_key
+        if not result:
+            result = {"success": True, "cached": True, **engine.load_stats,
+                      "message": f"Berhasil memuat {len(engine.raw_data)} baris data mentah."}
+        return result
+
+    def recommend_clusters(self, **kwargs):
+        # Hasil sweep disimpan di engine bersama (deterministik), jadi dihitung sekali per dataset
+        if self.is_shared:
+            with self._registry.lock_for(("sweep",) + self._held["key"]):
+                return self._engine.recommend_clusters(**kwargs)
+        return self._engine.recommend_clusters(**kwargs)
+
+    def process_data_clustering(self, n_clusters, progress=None, **kwargs):
+        # Dicatat sebelum training: bisa berjalan di thread latar sementara sesi memuat data lain
+        generation = self._generation
+        if not self.is_shared or self._data_key is None:
+            # Engine privat, atau engine bersama tanpa dataset asal (model tersimpan): latih
+            # pada salinan lalu pasang utuh, agar view tidak setengah jadi saat training dibatalkan
+            engine = self._engine.fork()
+            status = engine.process_data_clustering(n_clusters, progress=progress, **kwargs)
+            if status == "Sukses" and not self._attach_if_current(None, engine, generation):
+                return STALE_TRAINING_STATUS
+            return status
+
+        model_key = ("model",) + self._data_key[1:] + (n_clusters, tuple(sorted(kwargs.items())))
+        base = self._engine
+        result = {}
+
+        def build():
+            engine = base.fork()
+            result["status"] = engine.process_data_clustering(n_clusters, progress=progress, **kwargs)
+            return engine if result["status"] == "Sukses" else None
+
+        engine = self._registry.acquire(model_key, build, parent=self._held["key"])
+        if engine is None:
+            return result["status"]
+        if not self._attach_if_current(model_key, engine, generation):
+            self._registry.release(model_key)
+            return STALE_TRAINING_STATUS
+        return "Sukses"
+
+    def append_songs(self, new_rows, **kwargs):
+        with self._lock:
+            self._generation += 1
+        self._materialize()
+        return self._engine.append_songs(new_rows, **kwargs)
+
+    def load_model(self, directory):
+        state_path = os.path.join(directory, STATE_FILE)
+        try:
+            model_key = ("saved", os.path.abspath(directory), os.path.getmtime(state_path))
+        except OSError as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+        result = {}
+
+        def build():
+            engine = MusicMLEngine(cache_size=1, metrics=self._registry.metrics)
+            result.update(engine.load_model(directory))
+            return engine if result["success"] else None
+
+        engine = self._registry.acquire(model_key, build)
+        if engine is None:
+            return result
+        with self._lock:
+            self._generation += 1
+            self._attach(model_key, engine)
+            self._data_key = None
+        return result or {"success": True, "message": f"Berhasil memuat model dengan {len(engine.processed_data)} lagu."}
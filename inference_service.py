@@ -0,0 +1,344 @@
+"""
+Layanan HTTP lokal untuk klasifikasi mood batch lagu dari model hasil save_model.
+
+Contoh:
+    python inference_service.py --model-dir models/latest --port 8765 --watch-interval 5
+    curl -X POST localhost:8765/predict -H "Content-Type: application/json" \
+         -d '{"valence": [0.8, 0.2], "energy": [0.9, 0.1]}'
+
+Endpoint:
+    POST /predict  {"valence": [...], "energy": [...], "ids": [...] (opsional)}
+                   -> {"cluster_id": [...], "mood": [...], "rule_mood": [...], "ids": [...], "model": {...}}
+    POST /reload   {"model_dir": "..."} (opsional, hanya di bawah --model-root) -> muat ulang
+                   model tanpa downtime
+    GET  /health   -> status & info model aktif
+
+Request POST wajib ber-Content-Type application/json, sehingga halaman web lain tidak
+bisa mengirim "simple request" lintas origin ke layanan lokal ini.
+
+Request /predict yang datang bersamaan digabung (micro-batching) menjadi satu prediksi
+vektor. Model baru dimuat di thread terpisah lalu ditukar sekaligus; request yang sedang
+berjalan tetap memakai model lama.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+
+from music_engine import STATE_FILE, MusicMLEngine
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Micro-batching: tunggu paling lama BATCH_WINDOW detik setelah request pertama,
+# atau sampai MAX_BATCH_ROWS baris terkumpul
+BATCH_WINDOW = 0.002
+MAX_BATCH_ROWS = 100_000
+MAX_REQUEST_ROWS = 100_000
+MAX_BODY_BYTES = 16 * 2 ** 20
+MAX_HEADER_BYTES = 64 * 2 ** 10
+JSON_CONTENT_TYPE = "application/json"
+
+logger = logging.getLogger("inference_service")
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def load_engine(model_dir):
+    """Muat engine dari folder save_model; lempar RequestError jika gagal."""
+    engine = MusicMLEngine(cache_size=1)
+    res = engine.load_model(model_dir)
+    if not res["success"]:
+        raise RequestError(HTTPStatus.SERVICE_UNAVAILABLE, res["message"])
+    return engine
+
+
+def _parse_batch(payload):
+    """Validasi body /predict menjadi (valence, energy, ids) berbentuk array."""
+    if not isinstance(payload, dict):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Body harus objek JSON.")
+    try:
+        valence = np.asarray(payload["valence"], dtype=np.float64)
+        energy = np.asarray(payload["energy"], dtype=np.float64)
+    except KeyError as e:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"Field {e} wajib diisi.")
+    except (TypeError, ValueError):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "valence/energy harus array angka.")
+    if valence.ndim != 1 or valence.shape != energy.shape:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "valence dan energy harus array 1-D dengan panjang sama.")
+    if len(valence) > MAX_REQUEST_ROWS:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Maksimal {MAX_REQUEST_ROWS} baris per request.")
+    if not (np.isfinite(valence).all() and np.isfinite(energy).all()):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "valence/energy tidak boleh kosong atau NaN.")
+    ids = payload.get("ids")
+    if ids is not None and (not isinstance(ids, list) or len(ids) != len(valence)):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "ids harus array dengan panjang sama.")
+    return valence, energy, ids
+
+
+class InferenceService:
+    """Model aktif, antrian micro-batching, dan handler endpoint."""
+
+    def __init__(self, model_dir, batch_window=BATCH_WINDOW, max_batch_rows=MAX_BATCH_ROWS, model_root=None):
+        self.model_dir = model_dir
+        # Folder induk tempat /reload boleh memilih model lain (None = hanya model_dir awal)
+        self.model_root = os.path.realpath(model_root) if model_root else None
+        self.batch_window = batch_window
+        self.max_batch_rows = max_batch_rows
+        self.engine = None
+        self.model_info = None
+        self.stats = {"requests": 0, "rows": 0, "batches": 0, "reloads": 0}
+        # Prediksi & load model di thread agar event loop tetap melayani koneksi
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="inference")
+        self._queue = None
+        self._reload_lock = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._reload_lock = asyncio.Lock()
+        await self.reload()
+        asyncio.get_running_loop().create_task(self._batcher())
+
+    async def reload(self, model_dir=None):
+        """Muat model di thread latar lalu tukar referensi engine (request berjalan tidak terganggu)."""
+        model_dir = model_dir or self.model_dir
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            mtime = os.path.getmtime(os.path.join(model_dir, STATE_FILE))
+            engine = await loop.run_in_executor(self._executor, load_engine, model_dir)
+            self.engine, self.model_dir = engine, model_dir
+            self.model_info = {
+                "model_dir": os.path.abspath(model_dir),
+                "state_mtime": mtime,
+                "loaded_at": time.time(),
+                "data_hash": engine.data_hash,
+                "n_clusters": len(engine.cluster_labels),
+                "moods": [engine.cluster_labels[i] for i in range(len(engine.cluster_labels))],
+            }
+            self.stats["reloads"] += 1
+            logger.info(json.dumps({"event": "model_loaded", **self.model_info}))
+            return self.model_info
+
+    async def watch(self, interval):
+        """Muat ulang otomatis saat file state model berubah (misal setelah save_model)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.path.getmtime(os.path.join(self.model_dir, STATE_FILE))
+                if mtime != self.model_info["state_mtime"]:
+                    await self.reload()
+            except (OSError, RequestError) as e:
+                logger.warning(json.dumps({"event": "reload_failed", "error": str(e)}))
+
+    async def predict(self, valence, energy):
+        """Masukkan batch ke antrian micro-batching dan tunggu hasilnya."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((valence, energy, future))
+        return await future
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            rows = len(items[0][0])
+            deadline = loop.time() + self.batch_window
+            while rows < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                rows += len(item[0])
+
+            # Referensi engine diambil sekali per batch: hot-swap berlaku untuk batch berikutnya
+            engine, info = self.engine, self.model_info
+            valence = np.concatenate([item[0] for item in items])
+            energy = np.concatenate([item[1] for item in items])
+            try:
+                result = await loop.run_in_executor(self._executor, engine.predict_moods, valence, energy)
+            except Exception as e:
+                for *_, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats["batches"] += 1
+            start = 0
+            for item_valence, _, future in items:
+                end = start + len(item_valence)
+                if not future.done():
+                    future.set_result(({key: values[start:end] for key, values in result.items()}, info))
+                start = end
+
+    def _reload_dir(self, model_dir):
+        """Folder model dari body /reload; hanya diterima jika berada di bawah model_root."""
+        if self.model_root is None:
+            raise RequestError(HTTPStatus.FORBIDDEN,
+                               "model_dir hanya bisa diganti jika layanan dijalankan dengan --model-root.")
+        if not isinstance(model_dir, str):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "model_dir harus string.")
+        path = os.path.realpath(os.path.join(self.model_root, model_dir))
+        if os.path.commonpath([path, self.model_root]) != self.model_root:
+            raise RequestError(HTTPStatus.FORBIDDEN, "model_dir harus berada di dalam --model-root.")
+        return path
+
+    async def handle(self, method, path, body, content_type=None):
+        """Routing endpoint; kembalikan (status, objek JSON)."""
+        if path == "/health":
+            if method != "GET":
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Gunakan GET.")
+            return HTTPStatus.OK, {"status": "ok", "model": self.model_info, "stats": self.stats}
+        if path not in ("/predict", "/reload"):
+            raise RequestError(HTTPStatus.NOT_FOUND, "Endpoint tidak ditemukan.")
+        if method != "POST":
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Gunakan POST.")
+        if (content_type or "").split(";", 1)[0].strip().lower() != JSON_CONTENT_TYPE:
+            raise RequestError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f"Content-Type harus {JSON_CONTENT_TYPE}.")
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body bukan JSON yang valid.")
+
+        if path == "/reload":
+            model_dir = payload.get("model_dir") if isinstance(payload, dict) else None
+            if model_dir is not None:
+                model_dir = self._reload_dir(model_dir)
+            try:
+                info = await self.reload(model_dir)
+            except OSError as e:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Error: {str(e)}")
+            return HTTPStatus.OK, {"status": "reloaded", "model": info}
+
+        valence, energy, ids = _parse_batch(payload)
+        if len(valence) == 0:
+            # Tidak perlu masuk antrian micro-batching
+            engine, info = self.engine, self.model_info
+            result = engine.predict_moods(valence, energy)
+        else:
+            result, info = await self.predict(valence, energy)
+        self.stats["requests"] += 1
+        self.stats["rows"] += len(valence)
+        response = {
+            "cluster_id": result["cluster_id"].tolist(),
+            "mood": result["mood"].tolist(),
+            "rule_mood": result["rule_mood"].tolist(),
+            "model": {"data_hash": info["data_hash"], "loaded_at": info["loaded_at"]},
+        }
+        if ids is not None:
+            response["ids"] = ids
+        return HTTPStatus.OK, response
+
+    async def serve_connection(self, reader, writer):
+        """Server HTTP/1.1 minimal: keep-alive, body dengan Content-Length."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {"error": "Header terlalu besar."}, keep_alive=False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Request line tidak valid."},
+                                        keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                body = None
+
+                try:
+                    try:
+                        length = int(headers.get("content-length", 0))
+                    except ValueError:
+                        raise RequestError(HTTPStatus.BAD_REQUEST, "Content-Length tidak valid.")
+                    if length > MAX_BODY_BYTES:
+                        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body terlalu besar.")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle(method, target.split("?", 1)[0], body,
+                                                        headers.get("content-type"))
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                    # Body tidak dibaca: koneksi tidak bisa dipakai ulang
+                    if body is None:
+                        keep_alive = False
+                except Exception as e:
+                    logger.exception("Request gagal")
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(model_dir, host=DEFAULT_HOST, port=DEFAULT_PORT, watch_interval=0, batch_window=BATCH_WINDOW,
+                model_root=None):
+    service = InferenceService(model_dir, batch_window=batch_window, model_root=model_root)
+    await service.start()
+    server = await asyncio.start_server(service.serve_connection, host, port, limit=MAX_HEADER_BYTES)
+    if watch_interval:
+        asyncio.get_running_loop().create_task(service.watch(watch_interval))
+    logger.info(json.dumps({"event": "listening", "host": host, "port": port}))
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan HTTP klasifikasi mood dari model tersimpan.")
+    parser.add_argument("--model-dir", default="models/latest", help="Folder hasil save_model")
+    parser.add_argument("--model-root", default=None,
+                        help="Folder induk yang boleh dipilih lewat model_dir di /reload (default: tidak boleh)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--watch-interval", type=float, default=0,
+                        help="Cek perubahan model tiap N detik dan muat ulang otomatis (0 = mati)")
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW * 1000,
+                        help="Jendela micro-batching dalam milidetik")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        asyncio.run(serve(args.model_dir, args.host, args.port, args.watch_interval, args.batch_window_ms / 1000,
+                          args.model_root))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, RequestError) as e:
+        logger.error(json.dumps({"event": "startup_failed", "error": str(e)}))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
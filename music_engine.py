@@ -1,15 +1,668 @@
+import bisect
+import copy
+import cProfile
+import functools
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import pstats
+import threading
+import time
+import uuid
+import tracemalloc
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import joblib
 import pandas as pd
 import numpy as np
+from pandas.api.types import union_categoricals
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import silhouette_score
+from sklearn.metrics import silhouette_score, calinski_harabasz_score, adjusted_rand_score, pairwise_distances_argmin
+from sklearn.neighbors import KDTree
+from scipy.optimize import linear_sum_assignment
+from threadpoolctl import threadpool_limits
+
+logger = logging.getLogger(__name__)
+
+# Kandidat jumlah cluster untuk rekomendasi (k-sweep)
+K_CANDIDATES = range(2, 7)
+# Di atas jumlah baris ini, mode "auto" memakai sweep scalable (silhouette sampel + paralel)
+SCALABLE_ROW_THRESHOLD = 50_000
+# Resolusi grid 2-D (per sumbu) untuk engine K-Means histogram
+HIST_BINS = 512
+
+# Ingest hemat memori: hanya kolom yang dipakai engine (+ kolom pilihan user)
+ENGINE_COLUMNS = ["artist", "song", "genre", "valence", "energy", "danceability", "acousticness"]
+AUDIO_FEATURES = ["valence", "energy", "danceability", "acousticness"]
+CATEGORICAL_COLUMNS = ["artist", "genre"]
+LOW_MEMORY_CHUNKSIZE = 100_000
+
+# Panjang n-gram untuk indeks pencarian judul/artis
+SEARCH_NGRAM = 3
+# Di bawah jumlah kandidat ini sisa n-gram tidak di-intersect, langsung verifikasi substring
+SEARCH_VERIFY_ROWS = 256
+# Batas potongan saat indeks n-gram dibangun: jumlah judul, dan jumlah sel karakter
+# (judul x judul terpanjang) agar satu judul yang sangat panjang tidak membengkakkan memori
+SEARCH_INDEX_CHUNK = 65_536
+SEARCH_INDEX_CHUNK_CHARS = 2 ** 22
+# Bit per code point Unicode (maks 0x10FFFF): n-gram 3 karakter muat dalam satu int64
+_CODEPOINT_BITS = 21
+# Instrumentasi: batas atas bucket histogram latensi (detik), jumlah panggilan terakhir yang
+# disimpan, baris cProfile yang ditampilkan, dan sisa waktu minimum untuk tahap "lainnya"
+METRICS_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+METRICS_RECENT_CALLS = 50
+METRICS_PROFILE_LINES = 30
+METRICS_MIN_STAGE_SECONDS = 0.0005
+# Fitur audio untuk lagu serupa (valence & energy wajib, sisanya dipakai jika ada)
+SIMILARITY_FEATURES = ["valence", "energy", "danceability", "acousticness"]
+
+# Batas untuk merekomendasikan training ulang penuh setelah append_songs
+REFIT_GROWTH_RATIO = 0.2      # baris baru sejak training / baris saat training
+REFIT_INERTIA_RATIO = 1.5     # jarak rata-rata batch baru / jarak rata-rata saat training
+REFIT_CENTROID_SHIFT = 0.05   # pergeseran centroid (skala 0-1) pada mode online
+REFIT_OUT_OF_RANGE = 0.01     # proporsi baris baru di luar rentang scaler
+
+# Peta persebaran skala besar: jumlah titik sampel & resolusi grid density per mood
+SCATTER_SAMPLE_POINTS = 5_000
+SCATTER_DENSITY_BINS = 64
+
+# Nama mood hasil aturan kuadran valence/energy (urutan kategori kolom rule_mood)
+MOOD_NAMES = ["Euphoric", "Energetic", "Happy", "Aggressive", "Tense", "Melancholic", "Sad", "Peaceful", "Calm"]
+
+# Persistensi model: katalog (Arrow/Feather, bisa di-memory-map) + state model (joblib)
+CATALOG_FILE = "catalog.feather"
+STATE_FILE = "model.joblib"
+SEARCH_INDEX_FILE = "search_index.joblib"
+MODEL_FORMAT_VERSION = 3
+SUPPORTED_MODEL_VERSIONS = (1, 2, 3)
+# Kolom turunan processed_data (bukan bagian data mentah)
+DERIVED_COLUMNS = ["cluster_id", "mood", "rule_mood"]
+# Kolom per baris dari format lama (v1); kini metode disimpan di run_info dan judul dihitung saat perlu
+LEGACY_DERIVED_COLUMNS = ["method", "display_title"]
+
+
+def read_upload_bytes(uploaded_file):
+    """Ambil isi file (UploadedFile Streamlit, file-like, atau path) sebagai bytes."""
+    if hasattr(uploaded_file, "getvalue"):
+        data = uploaded_file.getvalue()
+    elif hasattr(uploaded_file, "read"):
+        data = uploaded_file.read()
+    else:
+        with open(uploaded_file, "rb") as f:
+            data = f.read()
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+def dataset_key(content, low_memory=False, columns=None, chunksize=None, max_rows=None, max_memory_mb=None):
+    """Kunci dataset: hash isi file + opsi load (dipakai cache upload dan registry engine bersama)."""
+    data_hash = hashlib.sha256(content).hexdigest()
+    return data_hash, (low_memory, tuple(columns or ()), chunksize, max_rows, max_memory_mb)
+
+
+def display_titles(df):
+    """Judul tampilan "song - artist" hanya untuk baris `df` (dihitung saat dibutuhkan, tidak disimpan)."""
+    return df['song'].astype(object) + " - " + df['artist'].astype(object)
+
+
+@contextmanager
+def _track_peak_memory():
+    """Ukur puncak alokasi memori yang terlacak tracemalloc selama blok berjalan (bytes)."""
+    stats = {}
+    was_tracing = tracemalloc.is_tracing()
+    if was_tracing:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        yield stats
+    finally:
+        stats["peak_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+        if not was_tracing:
+            tracemalloc.stop()
+
+
+def _build_ngram_index(titles, n=SEARCH_NGRAM, offset=0, chunk_size=SEARCH_INDEX_CHUNK,
+                       max_chars=SEARCH_INDEX_CHUNK_CHARS):
+    """
+    Indeks terbalik n-gram -> array posisi baris int32 (terurut) dari judul lowercase.
+    Vektor per potongan judul: setiap n-gram dikodekan menjadi satu int64 dari code point
+    karakternya, lalu pasangan (kode, posisi) dikelompokkan lewat sort, tanpa loop per judul.
+    Potongan dipadatkan ke judul terpanjangnya, jadi ukurannya dibatasi `chunk_size` judul
+    dan `max_chars` sel karakter.
+    """
+    values = np.asarray(titles, dtype=object)
+    title_lengths = pd.Series(values, dtype=object).str.len().fillna(0).to_numpy(np.int64)
+    codes, positions = [], []
+    start = 0
+    while start < len(values):
+        end = min(start + chunk_size, len(values))
+        longest = int(title_lengths[start:end].max())
+        if longest * (end - start) > max_chars:
+            end = start + max(1, max_chars // longest)
+        chunk = values[start:end]
+        chunk_start, start = start, end
+        rows = np.flatnonzero(pd.notna(chunk))
+        if len(rows) == 0:
+            continue
+        chars = np.array(chunk[rows].tolist(), dtype=str)
+        lengths = np.char.str_len(chars)
+        width = chars.dtype.itemsize // 4
+        if width < n:
+            continue
+        chars = chars.view(np.uint32).reshape(len(rows), width).astype(np.int64)
+        span = width - n + 1
+        gram = np.zeros((len(rows), span), dtype=np.int64)
+        for i in range(n):
+            gram |= chars[:, i:i + span] << (_CODEPOINT_BITS * (n - 1 - i))
+        # Posisi di luar panjang judul diberi -1; sort per judul agar n-gram berulang
+        # dalam satu judul bersebelahan dan cukup dicatat sekali
+        gram[np.arange(span) >= (lengths - n + 1)[:, None]] = -1
+        gram.sort(axis=1)
+        keep = gram != -1
+        keep[:, 1:] &= gram[:, 1:] != gram[:, :-1]
+        codes.append(gram[keep])
+        chunk_rows = (rows + chunk_start + offset).astype(np.int32)
+        positions.append(np.broadcast_to(chunk_rows[:, None], gram.shape)[keep])
+    if not codes:
+        return {}
+
+    # Kode n-gram -> id rapat (hash, O(n)), lalu sort stabil per id dengan radix sort 16-bit
+    # (dua lintasan jika id > 65535); posisi per n-gram tetap terurut karena stabil
+    ids, uniques = pd.factorize(np.concatenate(codes))
+    positions = np.concatenate(positions)
+    order = np.argsort((ids & 0xFFFF).astype(np.uint16), kind="stable")
+    if len(uniques) > 0x10000:
+        order = order[np.argsort((ids[order] >> 16).astype(np.uint16), kind="stable")]
+    positions = positions[order]
+    bounds = np.cumsum(np.bincount(ids, minlength=len(uniques)))[:-1]
+    mask = (1 << _CODEPOINT_BITS) - 1
+    grams = ["".join(chr((int(code) >> (_CODEPOINT_BITS * (n - 1 - i))) & mask) for i in range(n))
+             for code in uniques]
+    return dict(zip(grams, np.split(positions, bounds)))
+
+
+def _arrays_nbytes(arrays):
+    """Total byte array numpy; memmap dilewati (halaman file dikelola OS, bukan memori proses)."""
+    return sum(a.nbytes for a in arrays if a is not None and not isinstance(a, np.memmap))
+
+
+def _column_storage(series):
+    """
+    Kunci buffer data kolom (alamat, ukuran). Kolom yang dibagi antar frame (salinan dangkal,
+    proyeksi kolom) punya kunci sama walau objek Series-nya berbeda.
+    """
+    array = series.array
+    if isinstance(array, pd.Categorical):
+        values = array.codes
+    elif hasattr(array, "__arrow_array__"):
+        chunks = array.__arrow_array__().chunks
+        return tuple((buf.address, buf.size) for chunk in chunks for buf in chunk.buffers() if buf is not None)
+    else:
+        values = series.to_numpy()
+    return values.__array_interface__["data"][0], values.nbytes
+
+
+def _frames_nbytes(frames, counted):
+    """Memori (deep) kolom `frames` yang buffer-nya belum ada di `counted`; `counted` ikut diisi."""
+    total = 0
+    for df in frames:
+        usage = df.memory_usage(deep=True, index=False)
+        total += int(df.index.memory_usage(deep=True))
+        for i in range(df.shape[1]):
+            key = _column_storage(df.iloc[:, i])
+            if key not in counted:
+                counted.add(key)
+                total += int(usage.iloc[i])
+    return total
+
+
+def _combine_title_hash(song_hash, artist_hash):
+    # Pengali ganjil 64-bit (golden ratio) agar (a, b) dan (b, a) tidak bertabrakan
+    return song_hash * np.uint64(0x9E3779B97F4A7C15) ^ artist_hash
+
+
+def _title_hashes(df):
+    """Hash uint64 per baris dari pasangan (song, artist), tanpa membentuk string judul."""
+    return _combine_title_hash(pd.util.hash_pandas_object(df['song'], index=False).to_numpy(),
+                               pd.util.hash_pandas_object(df['artist'], index=False).to_numpy())
+
+
+def _title_hash(song, artist):
+    """Hash satu pasangan (song, artist), sama dengan hasil _title_hashes untuk baris tersebut."""
+    values = np.array([song, artist], dtype=object)
+    song_hash, artist_hash = pd.util.hash_array(values, categorize=False)
+    return _combine_title_hash(np.array([song_hash]), np.array([artist_hash]))[0]
+
+
+def _versioned_name(filename, token):
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}-{token}{ext}"
+
+
+def _model_files(state):
+    """Nama file katalog & indeks yang ditunjuk state model (format < 3 memakai nama tetap)."""
+    return state.get("files") or {"catalog": CATALOG_FILE, "search_index": SEARCH_INDEX_FILE}
+
+
+def _remove_stale_model_files(directory, keep):
+    """Hapus katalog/indeks versi lama di `directory` yang tidak ada di `keep`."""
+    def is_model_file(name):
+        for filename in (CATALOG_FILE, SEARCH_INDEX_FILE):
+            stem, ext = os.path.splitext(filename)
+            if name == filename or (name.startswith(stem + "-") and name.endswith((ext, ext + ".tmp"))):
+                return True
+        return False
+
+    for name in os.listdir(directory):
+        if name in keep or not is_model_file(name):
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass  # misal masih di-memory-map di Windows; dibersihkan pada save berikutnya
+
+
+def _label_moods(valence, energy):
+    """
+    Versi vektor dari MusicMLEngine._get_detailed_mood_name: aturan kuadran dan
+    intensitas yang sama, diterapkan ke seluruh array sekaligus. Hasil: Categorical.
+    """
+    v = np.asarray(valence, dtype=np.float64)
+    e = np.asarray(energy, dtype=np.float64)
+    q1 = (v >= 0.5) & (e >= 0.5)
+    q2 = (v < 0.5) & (e >= 0.5)
+    q3 = (v < 0.5) & (e < 0.5)
+    q4 = ~(q1 | q2 | q3)
+    # Urutan kondisi = MOOD_NAMES, mengikuti urutan cabang pada versi skalar
+    conditions = [
+        q1 & (e > 0.75), q1 & (v > 0.75), q1,
+        q2 & (e > 0.75), q2,
+        q3 & (v < 0.25), q3,
+        q4 & (v > 0.75),
+    ]
+    codes = np.select(conditions, range(len(conditions)), default=len(MOOD_NAMES) - 1).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=MOOD_NAMES)
+
+
+def _merge_rows(index, extra):
+    """Gabungkan dua indeks {kunci: array posisi}; posisi di `extra` berada setelah `index`."""
+    merged = dict(index)
+    for key, rows in extra.items():
+        merged[key] = np.concatenate((merged[key], rows)) if key in merged else rows
+    return merged
+
+
+def _align_batch(batch, like):
+    """Samakan kolom & dtype batch baru dengan frame `like` sebelum digabung."""
+    batch = batch.reindex(columns=like.columns)
+    for col, dtype in like.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Kategori harus ber-dtype sama agar bisa digabung dengan union_categoricals
+            values = batch[col].astype(object)
+            categories = pd.Index(values.dropna().unique()).astype(dtype.categories.dtype)
+            batch[col] = pd.Categorical(values, categories=categories)
+        elif pd.api.types.is_float_dtype(dtype):
+            batch[col] = batch[col].astype(dtype)
+    return batch
+
+
+def _concat_chunks(chunks):
+    """Gabungkan chunk CSV tanpa mengubah kolom kategori menjadi object."""
+    first = chunks[0]
+    cat_cols = [c for c in first.columns if isinstance(first[c].dtype, pd.CategoricalDtype)]
+    df = pd.concat([chunk.drop(columns=cat_cols) for chunk in chunks], ignore_index=True)
+    for col in cat_cols:
+        df[col] = union_categoricals([chunk[col] for chunk in chunks])
+    return df[list(first.columns)]
+
+
+def _has_more_rows(reader):
+    """True jika reader CSV per chunk masih punya baris (hanya satu baris yang dibaca)."""
+    try:
+        reader.get_chunk(1)
+    except StopIteration:
+        return False
+    return True
+
+
+def _read_csv_low_memory(content, columns=None, chunksize=None, max_rows=None, max_memory_mb=None):
+    """
+    Baca CSV dengan proyeksi kolom (ENGINE_COLUMNS + `columns`), fitur audio float32,
+    artist/genre kategori. Jika chunksize/max_rows/max_memory_mb diisi, file dibaca
+    per chunk dan berhenti saat batas baris atau memori tercapai.
+    Mengembalikan (DataFrame, truncated).
+    """
+    header = pd.read_csv(io.BytesIO(content), nrows=0).columns
+    wanted = set(ENGINE_COLUMNS) | {c.lower() for c in (columns or [])}
+    usecols = [c for c in header if c.lower() in wanted]
+    dtype = {}
+    for col in usecols:
+        if col.lower() in AUDIO_FEATURES:
+            dtype[col] = np.float32
+        elif col.lower() in CATEGORICAL_COLUMNS:
+            dtype[col] = "category"
+
+    if not (chunksize or max_rows or max_memory_mb):
+        return pd.read_csv(io.BytesIO(content), usecols=usecols, dtype=dtype), False
+
+    max_bytes = max_memory_mb * 2 ** 20 if max_memory_mb else None
+    chunks, n_rows, n_bytes, truncated = [], 0, 0, False
+    with pd.read_csv(io.BytesIO(content), usecols=usecols, dtype=dtype,
+                     chunksize=chunksize or LOW_MEMORY_CHUNKSIZE) as reader:
+        for chunk in reader:
+            if max_rows and n_rows + len(chunk) >= max_rows:
+                truncated = n_rows + len(chunk) > max_rows or _has_more_rows(reader)
+                chunk = chunk.iloc[:max_rows - n_rows]
+            chunk_bytes = chunk.memory_usage(deep=True).sum()
+            if max_bytes and n_bytes + chunk_bytes > max_bytes:
+                # Ambil sebagian chunk yang masih muat dalam batas memori
+                keep = int(len(chunk) * (max_bytes - n_bytes) / chunk_bytes)
+                chunk, truncated = chunk.iloc[:keep], True
+            chunks.append(chunk)
+            n_rows += len(chunk)
+            n_bytes += chunk_bytes
+            if truncated or (max_rows and n_rows >= max_rows):
+                break
+    if not chunks:
+        return pd.read_csv(io.BytesIO(content), usecols=usecols, dtype=dtype, nrows=0), False
+    return _concat_chunks(chunks), truncated
+
+
+def _fit_histogram_kmeans(X_scaled, k, bins=HIST_BINS):
+    """
+    K-Means berbobot pada grid 2-D: titik (sudah di-scale ke [0, 1]) dikuantisasi ke
+    bins x bins sel, lalu K-Means dilatih pada pusat sel yang terisi dengan jumlah
+    titik sebagai bobot. Label akhir diberikan lewat satu pass nearest-centroid.
+    """
+    cells = np.clip((X_scaled * bins).astype(np.int64), 0, bins - 1)
+    flat = cells[:, 0] * bins + cells[:, 1]
+    counts = np.bincount(flat, minlength=bins * bins)
+    occupied = np.flatnonzero(counts)
+    if len(occupied) < k:
+        # Terlalu sedikit sel terisi untuk k cluster: latih langsung pada titik
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+        return kmeans, kmeans.fit_predict(X_scaled)
+
+    centres = np.column_stack(((occupied // bins + 0.5) / bins, (occupied % bins + 0.5) / bins))
+    # Samakan dtype dengan titik (float32 pada mode hemat memori) agar predict konsisten
+    centres = centres.astype(X_scaled.dtype, copy=False)
+    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+    kmeans.fit(centres, sample_weight=counts[occupied])
+    return kmeans, kmeans.predict(X_scaled)
+
+
+def _fit_kmeans(X_scaled, k, algorithm="kmeans", bins=HIST_BINS):
+    """Latih model sesuai algoritma ("kmeans" exact atau "histogram"); kembalikan (model, label titik)."""
+    if algorithm == "histogram":
+        return _fit_histogram_kmeans(X_scaled, k, bins)
+    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+    return kmeans, kmeans.fit_predict(X_scaled)
+
+
+def _fit_and_score_k(X_scaled, k, criterion, sample_size, n_threads=None, algorithm="kmeans", bins=HIST_BINS):
+    """
+    Latih K-Means untuk satu nilai k dan hitung skornya (dipakai juga oleh worker proses).
+    Mengembalikan (k, model, label, skor, total detik, detik training).
+    """
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_threads):
+        kmeans, labels = _fit_kmeans(X_scaled, k, algorithm, bins)
+        fit_time = time.perf_counter() - start
+        if criterion == "silhouette":
+            # Sampel dibatasi & seed tetap: hasil reproducible dan memori tidak O(n^2)
+            use_sample = sample_size if sample_size and len(X_scaled) > sample_size else None
+            score = silhouette_score(X_scaled, labels, sample_size=use_sample, random_state=42)
+        elif criterion == "calinski_harabasz":
+            score = calinski_harabasz_score(X_scaled, labels)
+        else:
+            # Inertia dihitung pada titik asli (untuk histogram, inertia_ model hanya atas pusat sel)
+            score = -kmeans.score(X_scaled) if algorithm == "histogram" else kmeans.inertia_
+    return k, kmeans, labels, float(score), time.perf_counter() - start, fit_time
+
+
+def _no_progress(stage, fraction):
+    """Callback progress default (tidak melakukan apa-apa)."""
+
+
+def _elbow_k(inertias):
+    """Pilih k pada 'siku' kurva inertia (selisih kedua terbesar)."""
+    ks = sorted(inertias)
+    if len(ks) < 3:
+        return ks[0]
+    bends = {ks[i]: inertias[ks[i - 1]] - 2 * inertias[ks[i]] + inertias[ks[i + 1]]
+             for i in range(1, len(ks) - 1)}
+    return max(bends, key=bends.get)
+
+
+class EngineMetrics:
+    """
+    Instrumentasi engine: jumlah panggilan, histogram latensi, dan waktu (+ puncak memori
+    opsional via tracemalloc) per tahap untuk setiap method publik. Setiap panggilan juga
+    ditulis sebagai satu baris log JSON ke logger "music_engine".
+
+    Tahap dicatat dengan `lap(nama)`: durasi sejak lap sebelumnya (atau awal panggilan).
+    Puncak memori per tahap bersifat perkiraan jika beberapa thread berjalan bersamaan
+    karena tracemalloc berlaku untuk seluruh proses.
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profile_pending = None
+        self.reset()
+
+    def __deepcopy__(self, memo):
+        # Salinan engine (copy-on-write) tetap melapor ke metrik yang sama
+        return self
+
+    def reset(self):
+        with self._lock:
+            self._methods = {}
+            self._recent = deque(maxlen=METRICS_RECENT_CALLS)
+            self.last_profile = None
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def call(self, method):
+        """Ukur satu panggilan method (bersarang diperbolehkan; tahap masuk ke panggilan terdalam)."""
+        started_tracing = False
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        record = {"method": method, "stages": [], "ok": True, "peak_mb": None}
+        record["_start"] = record["_lap"] = time.perf_counter()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            # _base: memori terlacak di awal panggilan, _mem: di awal tahap berjalan
+            record["_base"] = record["_mem"] = tracemalloc.get_traced_memory()[0]
+            record["_peak"] = 0
+        profiler = None
+        if self._profile_pending == method:
+            self._profile_pending = None
+            profiler = cProfile.Profile()
+            profiler.enable()
+        stack = self._stack()
+        stack.append(record)
+        try:
+            yield record
+        except BaseException:
+            record["ok"] = False
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if record["stages"] and time.perf_counter() - record["_lap"] > METRICS_MIN_STAGE_SECONDS:
+                self.lap("other")
+            stack.pop()
+            self._finish(record, profiler)
+            if started_tracing:
+                tracemalloc.stop()
+
+    def lap(self, stage):
+        """Tutup tahap berjalan pada panggilan aktif dengan nama `stage`."""
+        stack = self._stack()
+        if not stack:
+            return
+        record = stack[-1]
+        now = time.perf_counter()
+        entry = {"stage": stage, "seconds": now - record["_lap"], "peak_mb": None}
+        record["_lap"] = now
+        if "_mem" in record and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            entry["peak_mb"] = max(0, peak - record["_mem"]) / 2 ** 20
+            record["_peak"] = max(record["_peak"], peak - record["_base"])
+            record["_mem"] = current
+            tracemalloc.reset_peak()
+        record["stages"].append(entry)
+
+    def add_stage(self, stage, seconds):
+        """Catat tahap yang diukur di tempat lain (misal di worker proses) pada panggilan aktif."""
+        stack = self._stack()
+        if stack:
+            stack[-1]["stages"].append({"stage": stage, "seconds": seconds, "peak_mb": None})
+
+    def profile_next_call(self, method):
+        """Rekam cProfile untuk panggilan berikutnya dari `method` (hasil di `last_profile`)."""
+        self._profile_pending = method
+
+    def _finish(self, record, profiler):
+        end = time.perf_counter()
+        record["seconds"] = end - record.pop("_start")
+        record.pop("_lap")
+        if "_mem" in record:
+            if tracemalloc.is_tracing():
+                record["_peak"] = max(record["_peak"], tracemalloc.get_traced_memory()[1] - record["_base"])
+            record["peak_mb"] = max(0, record["_peak"]) / 2 ** 20
+        for key in ("_base", "_mem", "_peak"):
+            record.pop(key, None)
+        record["time"] = time.time()
+
+        profile_text = None
+        if profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(METRICS_PROFILE_LINES)
+            profile_text = out.getvalue()
+
+        with self._lock:
+            stats = self._methods.get(record["method"])
+            if stats is None:
+                stats = self._methods[record["method"]] = {
+                    "count": 0, "errors": 0, "total_s": 0.0, "min_s": float("inf"), "max_s": 0.0,
+                    "histogram": [0] * (len(METRICS_LATENCY_BUCKETS) + 1), "stages": {},
+                }
+            stats["count"] += 1
+            stats["errors"] += not record["ok"]
+            stats["total_s"] += record["seconds"]
+            stats["min_s"] = min(stats["min_s"], record["seconds"])
+            stats["max_s"] = max(stats["max_s"], record["seconds"])
+            stats["histogram"][bisect.bisect_left(METRICS_LATENCY_BUCKETS, record["seconds"])] += 1
+            for entry in record["stages"]:
+                stage = stats["stages"].setdefault(entry["stage"], {"count": 0, "total_s": 0.0, "max_s": 0.0})
+                stage["count"] += 1
+                stage["total_s"] += entry["seconds"]
+                stage["max_s"] = max(stage["max_s"], entry["seconds"])
+            self._recent.append(record)
+            if profile_text is not None:
+                self.last_profile = {"method": record["method"], "time": record["time"], "stats": profile_text}
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "engine_call", **record}, default=str))
+
+    def snapshot(self):
+        """Salinan metrik untuk ditampilkan: agregat per method, panggilan terakhir, profil terakhir."""
+        labels = [f"<={b * 1000:g}ms" for b in METRICS_LATENCY_BUCKETS] + [f">{METRICS_LATENCY_BUCKETS[-1] * 1000:g}ms"]
+        with self._lock:
+            methods = {}
+            for name, stats in self._methods.items():
+                methods[name] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "total_s": stats["total_s"],
+                    "mean_s": stats["total_s"] / stats["count"],
+                    "min_s": stats["min_s"],
+                    "max_s": stats["max_s"],
+                    "histogram": dict(zip(labels, stats["histogram"])),
+                    "stages": {stage: {**values, "mean_s": values["total_s"] / values["count"]}
+                               for stage, values in stats["stages"].items()},
+                }
+            return {
+                "methods": methods,
+                "recent": [dict(r, stages=list(r["stages"])) for r in self._recent],
+                "last_profile": self.last_profile,
+                "track_memory": self.track_memory,
+                "profile_pending": self._profile_pending,
+            }
+
+
+def _instrumented(method):
+    """Dekorator: ukur setiap panggilan method engine lewat self._metrics."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._metrics.call(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class MusicMLEngine:
-    def __init__(self):
+    def __init__(self, cache_size=4, metrics=None):
         self.raw_data = None
         self.processed_data = None
         self.cluster_metrics = None 
         self.centroids = None       
+
+        # Cache upload (LRU) berdasarkan hash isi file, agar rerun Streamlit
+        # tidak mem-parsing CSV dan mengulang k-sweep untuk file yang sama.
+        self.data_hash = None
+        self.load_stats = {}
+        self._cache_key = None
+        self.cache_size = cache_size
+        self.cache_stats = {"hits": 0, "misses": 0}
+        self._upload_cache = OrderedDict()
+        # Hasil k-sweep terakhir: {"scaler", "models", "labels"} (dipakai ulang saat clustering)
+        self._sweep = None
+
+        # Scaler & model K-Means yang dipakai untuk processed_data
+        self.scaler = None
+        self.model = None
+        self.reused_sweep_fit = False
+        self.cluster_labels = None
+        # Info run clustering (metode, k) disimpan sekali di engine, bukan sebagai kolom per baris
+        self.run_info = None
+
+        # State untuk append_songs: centroid (skala 0-1) yang dipakai prediksi,
+        # ukuran cluster, dan statistik saat training terakhir
+        self._centers = None
+        self._cluster_sizes = None
+        self._fit_info = None
+
+        # Indeks pencarian & lookup (posisi baris), dibangun sekali setelah clustering
+        self._search_index = None
+        # Lookup judul: (hash (song, artist) terurut, posisi baris int32)
+        self._title_index = None
+        self._mood_rows = None
+        self._genre_rows = None
+
+        # Indeks spasial lagu serupa: {"features", "X", "tree", "mood_trees"}
+        self._similarity = None
+
+        # Ringkasan dashboard (agregat), dibangun sekali per hasil clustering
+        self.summary = None
+
+        # Instrumentasi per method/tahap (dibagi dengan hasil fork/deepcopy, atau antar engine
+        # jika `metrics` diberikan, misal oleh EngineRegistry)
+        self._metrics = metrics or EngineMetrics()
         
         self.COLORS = {
             "moods": {
@@ -30,43 +683,246 @@ class MusicMLEngine:
             "text": "#FAFAFA"
         }
 
-    def load_data(self, uploaded_file):
+    @_instrumented
+    def load_data(self, uploaded_file, low_memory=False, columns=None, chunksize=None,
+                  max_rows=None, max_memory_mb=None):
+        """
+        Memuat CSV. Dengan low_memory=True hanya kolom engine (+ `columns`) yang dibaca,
+        fitur audio disimpan float32 dan artist/genre sebagai kategori; chunksize,
+        max_rows, dan max_memory_mb membaca file per chunk dengan batas baris/memori.
+        Mode ini juga melaporkan puncak memori selama load.
+        """
         try:
-            df = pd.read_csv(uploaded_file)
+            content = read_upload_bytes(uploaded_file)
+            self._metrics.lap("read_upload")
+            cache_key = dataset_key(content, low_memory, columns, chunksize, max_rows, max_memory_mb)
+            data_hash = cache_key[0]
+            self._metrics.lap("hash")
+
+            # File & opsi yang sama dengan data aktif (misal rerun Streamlit): state dipertahankan
+            if cache_key == self._cache_key and self.raw_data is not None:
+                self.cache_stats["hits"] += 1
+                return {"success": True, "cached": True, **self.load_stats,
+                        "message": f"Berhasil memuat {len(self.raw_data)} baris data mentah (cache)."}
+
+            entry = self._upload_cache.get(cache_key)
+            cached = entry is not None
+            if cached:
+                self.cache_stats["hits"] += 1
+                self._upload_cache.move_to_end(cache_key)
+            else:
+                self.cache_stats["misses"] += 1
+                load_stats = {"truncated": False}
+                if low_memory:
+                    with _track_peak_memory() as mem:
+                        df, truncated = _read_csv_low_memory(content, columns, chunksize, max_rows, max_memory_mb)
+                    load_stats = {"truncated": truncated, "peak_memory_mb": mem["peak_bytes"] / 2 ** 20}
+                else:
+                    df = pd.read_csv(io.BytesIO(content))
+                self._metrics.lap("parse_csv")
+                load_stats["memory_mb"] = float(df.memory_usage(deep=True).sum()) / 2 ** 20
+                self._metrics.lap("memory_usage")
+                entry = {"raw_data": df, "load_stats": load_stats, "cluster_metrics": None, "sweep": None}
+                self._upload_cache[cache_key] = entry
+                while len(self._upload_cache) > self.cache_size:
+                    self._upload_cache.popitem(last=False)
+
+            df = entry["raw_data"]
+            self.data_hash = data_hash
+            self._cache_key = cache_key
             self.raw_data = df
+            self.load_stats = entry["load_stats"]
             self.processed_data = None 
-            self.cluster_metrics = None
-            return {"success": True, "message": f"Berhasil memuat {len(df)} baris data mentah."}
+            self.cluster_metrics = entry["cluster_metrics"]
+            self._sweep = entry["sweep"]
+            message = f"Berhasil memuat {len(df)} baris data mentah."
+            if self.load_stats["truncated"]:
+                message += " (Dibatasi oleh batas baris/memori.)"
+            return {"success": True, "cached": cached, **self.load_stats, "message": message}
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
 
-    def recommend_clusters(self):
-        """Mencari jumlah cluster optimal menggunakan Silhouette Score."""
+    def fork(self):
+        """
+        Salinan dangkal: data mentah, hasil sweep, dan model dibagi (tidak disalin),
+        sehingga clustering ulang pada salinan tidak mengubah engine asal.
+        Untuk perubahan di tempat (append_songs) gunakan copy.deepcopy.
+        """
+        clone = copy.copy(self)
+        clone._upload_cache = OrderedDict(self._upload_cache)
+        clone.cache_stats = dict(self.cache_stats)
+        return clone
+
+    def get_metrics(self):
+        """
+        Metrik instrumentasi: per method (jumlah, error, rata-rata/min/max detik, histogram
+        latensi, rata-rata per tahap), panggilan terakhir beserta tahapnya, dan profil terakhir.
+        """
+        return self._metrics.snapshot()
+
+    def reset_metrics(self):
+        self._metrics.reset()
+
+    def set_memory_tracking(self, enabled):
+        """Aktifkan pengukuran puncak memori per tahap (tracemalloc; memperlambat alokasi)."""
+        self._metrics.track_memory = bool(enabled)
+
+    def profile_next_call(self, method):
+        """Rekam cProfile untuk panggilan berikutnya dari method `method` (lihat get_metrics)."""
+        self._metrics.profile_next_call(method)
+
+    def get_cache_info(self):
+        """Statistik cache upload (hit/miss dan jumlah dataset yang tersimpan)."""
+        return {**self.cache_stats, "entries": len(self._upload_cache), "max_entries": self.cache_size}
+
+    def _raw_frames(self):
+        frames = [self.raw_data] + [entry["raw_data"] for entry in self._upload_cache.values()]
+        return list({id(df): df for df in frames if df is not None}.values())
+
+    def _sweeps(self):
+        sweeps = [self._sweep] + [entry["sweep"] for entry in self._upload_cache.values()]
+        return {id(sweep): sweep for sweep in sweeps if sweep is not None}
+
+    def get_memory_usage(self, exclude=None):
+        """
+        Perkiraan memori engine per komponen (bytes): katalog, data mentah termasuk cache
+        upload, indeks pencarian/filter, indeks lagu serupa, dan label k-sweep, plus total.
+        Buffer kolom dan sweep yang dibagi dihitung sekali; yang juga dimiliki engine
+        `exclude` (misal engine data asal hasil fork) tidak dihitung sama sekali.
+        """
+        counted, excluded_sweeps = set(), set()
+        if exclude is not None:
+            _frames_nbytes([df for df in [exclude.processed_data] if df is not None] + exclude._raw_frames(),
+                           counted)
+            excluded_sweeps = set(exclude._sweeps())
+        usage = {
+            "catalog": _frames_nbytes([self.processed_data] if self.processed_data is not None else [], counted),
+            "raw_data": _frames_nbytes(self._raw_frames(), counted),
+        }
+
+        lookup = [self._mood_rows, self._genre_rows]
+        usage["search_index"] = _arrays_nbytes((self._search_index or {}).values())
+        usage["lookup_index"] = sum(_arrays_nbytes((rows or {}).values()) for rows in lookup) \
+            + _arrays_nbytes(self._title_index or ())
+
+        similarity = 0
+        if self._similarity is not None:
+            X = self._similarity["X"]
+            trees = [(self._similarity["tree"], None)] + list(self._similarity["mood_trees"].values())
+            similarity = X.nbytes
+            for tree, rows in trees:
+                # KD-tree tanpa filter mood memakai X langsung (tanpa salinan)
+                similarity += _arrays_nbytes(a for a in tree.get_arrays() if not np.shares_memory(a, X))
+                similarity += _arrays_nbytes([rows])
+        usage["similarity_index"] = similarity
+
+        usage["sweep_labels"] = sum(_arrays_nbytes(sweep["labels"].values())
+                                    for key, sweep in self._sweeps().items() if key not in excluded_sweeps)
+        usage["total"] = sum(usage.values())
+        return usage
+
+    @_instrumented
+    def recommend_clusters(self, mode="auto", criterion="silhouette", sample_size=10_000, n_jobs=None,
+                           algorithm="kmeans", bins=HIST_BINS, progress=None):
+        """
+        Mencari jumlah cluster optimal untuk k = 2..6.
+
+        mode="exact" memakai Silhouette Score penuh secara berurutan (perilaku lama).
+        mode="scalable" melatih setiap k paralel di process pool dan menilai dengan
+        silhouette pada sampel berukuran `sample_size` (seed tetap), atau kriteria
+        yang lebih murah: "calinski_harabasz" / "inertia" (metode siku).
+        mode="auto" memilih "scalable" jika data lebih dari SCALABLE_ROW_THRESHOLD baris.
+        Dengan n_jobs=1 mode "scalable" berjalan berurutan di proses ini (untuk worker batch).
+        algorithm="histogram" melatih K-Means berbobot pada grid `bins` x `bins`.
+        `progress(tahap, fraksi)` dipanggil setiap satu k selesai dilatih.
+        """
+        report = progress or _no_progress
         if self.raw_data is None: return None
+        if mode == "auto":
+            mode = "scalable" if len(self.raw_data) > SCALABLE_ROW_THRESHOLD else "exact"
+        if mode == "exact":
+            criterion, sample_size = "silhouette", None
+        sweep_params = {"mode": mode, "criterion": criterion, "sample_size": sample_size,
+                        "algorithm": algorithm, "bins": bins if algorithm == "histogram" else None}
+
+        # Hasil sweep untuk file yang sama diambil dari cache upload
+        entry = self._upload_cache.get(self._cache_key)
+        if entry is not None and entry["cluster_metrics"] is not None \
+                and entry["cluster_metrics"]["params"] == sweep_params:
+            self.cache_stats["hits"] += 1
+            self._upload_cache.move_to_end(self._cache_key)
+            self.cluster_metrics = entry["cluster_metrics"]
+            self._sweep = entry["sweep"]
+            return self.cluster_metrics
         
-        df = self.raw_data.copy()
+        # Salinan dangkal: hanya nama kolom yang diubah, data tidak disalin
+        df = self.raw_data.copy(deep=False)
         df.columns = [c.lower() for c in df.columns]
         if not all(col in df.columns for col in ['valence', 'energy']):
             return None
+        self._metrics.lap("copy_frame")
 
+        report("Scaling fitur", 0.0)
         scaler = MinMaxScaler()
         X_scaled = scaler.fit_transform(df[['valence', 'energy']])
-        
-        scores = {}
-        best_k = 2
-        best_score = -1
-        
-        for k in range(2, 7):
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-            labels = kmeans.fit_predict(X_scaled)
-            score = silhouette_score(X_scaled, labels)
-            scores[k] = score
-            
-            if score > best_score:
-                best_score = score
-                best_k = k
+        self._metrics.lap("scaling")
+
+        start = time.perf_counter()
+        results = []
+        if mode == "scalable":
+            n_jobs = n_jobs or min(len(K_CANDIDATES), os.cpu_count() or 1)
+        if mode == "scalable" and n_jobs > 1:
+            n_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+            # "spawn" agar aman dipanggil dari thread Streamlit (fork + OpenMP bisa deadlock)
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=ctx) as pool:
+                futures = [pool.submit(_fit_and_score_k, X_scaled, k, criterion, sample_size, n_threads,
+                                       algorithm, bins)
+                           for k in K_CANDIDATES]
+                try:
+                    for future in as_completed(futures):
+                        results.append(future.result())
+                        report(f"Sweep k={results[-1][0]} selesai", len(results) / len(futures))
+                except BaseException:
+                    # Dibatalkan/gagal: jangan tunggu k lain yang belum mulai
+                    for future in futures:
+                        future.cancel()
+                    raise
+            results.sort(key=lambda r: r[0])
+        else:
+            for i, k in enumerate(K_CANDIDATES):
+                report(f"Sweep k={k}", i / len(K_CANDIDATES))
+                results.append(_fit_and_score_k(X_scaled, k, criterion, sample_size, algorithm=algorithm, bins=bins))
+
+        self._metrics.lap("sweep")
+        for k, _, _, _, elapsed, fit_time in results:
+            self._metrics.add_stage(f"sweep/kmeans_fit[k={k}]", fit_time)
+            self._metrics.add_stage(f"sweep/{criterion}[k={k}]", elapsed - fit_time)
+        scores = {k: score for k, _, _, score, _, _ in results}
+        timings = {k: elapsed for k, _, _, _, elapsed, _ in results}
+        sweep = {
+            "scaler": scaler,
+            "models": {k: model for k, model, _, _, _, _ in results},
+            "labels": {k: labels for k, _, labels, _, _, _ in results},
+        }
+
+        if criterion == "inertia":
+            best_k = _elbow_k(scores)
+        else:
+            best_k = max(scores, key=scores.get)
                 
-        self.cluster_metrics = {"scores": scores, "best_k": best_k}
+        self.cluster_metrics = {
+            "scores": scores,
+            "best_k": best_k,
+            "criterion": criterion,
+            "timings": timings,
+            "total_time": time.perf_counter() - start,
+            "params": sweep_params,
+        }
+        self._sweep = sweep
+        if entry is not None:
+            entry["cluster_metrics"] = self.cluster_metrics
+            entry["sweep"] = sweep
         return self.cluster_metrics
 
     def _get_detailed_mood_name(self, valence, energy):
@@ -95,30 +951,65 @@ class MusicMLEngine:
             if valence > 0.75: return "Peaceful"
             return "Calm"
 
-    def process_data_clustering(self, n_clusters):
+    @_instrumented
+    def process_data_clustering(self, n_clusters, algorithm="kmeans", bins=HIST_BINS, progress=None):
+        """
+        Latih model dan beri label mood ke setiap lagu. `progress(tahap, fraksi)` dipanggil
+        di tiap tahap (scaling, training, pelabelan, indeks, ringkasan); callback boleh
+        melempar exception untuk membatalkan. Untuk pembatalan yang aman jalankan pada
+        fork() karena state engine diperbarui bertahap.
+        """
+        report = progress or _no_progress
         if self.raw_data is None:
             return "No Data"
             
-        df = self.raw_data.copy()
+        # Salinan dangkal: kolom hasil ditambahkan tanpa menyalin data mentah
+        df = self.raw_data.copy(deep=False)
         required_cols = ['artist', 'song', 'valence', 'energy']
         df.columns = [c.lower() for c in df.columns]
         
         if not all(col in df.columns for col in required_cols):
             return "Kolom wajib tidak lengkap (artist, song, valence, energy)"
+        self._metrics.lap("copy_frame")
 
-        # 1. Preprocessing
-        scaler = MinMaxScaler()
-        X = df[['valence', 'energy']]
-        X_scaled = scaler.fit_transform(X)
-
-        # 2. Modeling (K-Means)
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        clusters = kmeans.fit_predict(X_scaled)
+        # 1 & 2. Preprocessing + Modeling (K-Means)
+        # Jika k sudah dievaluasi saat rekomendasi (dengan algoritma yang sama),
+        # pakai ulang scaler, model, dan label hasil sweep
+        sweep_params = self.cluster_metrics["params"] if self.cluster_metrics else {}
+        same_algorithm = sweep_params.get("algorithm") == algorithm and \
+            (algorithm != "histogram" or sweep_params.get("bins") == bins)
+        report("Scaling fitur", 0.05)
+        if self._sweep is not None and same_algorithm and n_clusters in self._sweep["models"]:
+            scaler = self._sweep["scaler"]
+            kmeans = self._sweep["models"][n_clusters]
+            clusters = self._sweep["labels"][n_clusters]
+            self.reused_sweep_fit = True
+            self._metrics.lap("reuse_sweep")
+        else:
+            scaler = MinMaxScaler()
+            X = df[['valence', 'energy']]
+            X_scaled = scaler.fit_transform(X)
+            self._metrics.lap("scaling")
+            report(f"Melatih model (k={n_clusters})", 0.2)
+            kmeans, clusters = _fit_kmeans(X_scaled, n_clusters, algorithm, bins)
+            self.reused_sweep_fit = False
+            self._metrics.lap("kmeans_fit")
         
         df['cluster_id'] = clusters
+        self.scaler = scaler
+        self.model = kmeans
         self.centroids = scaler.inverse_transform(kmeans.cluster_centers_)
+        self._centers = kmeans.cluster_centers_.copy()
+        self._cluster_sizes = np.bincount(clusters, minlength=n_clusters)
+        self._fit_info = {
+            "rows": len(df),
+            "appended": 0,
+            "inertia_per_row": kmeans.inertia_ / max(len(df), 1),
+            "centers": kmeans.cluster_centers_.copy(),
+        }
         
         # 3. Smart Labeling (Nama Unik)
+        report("Pelabelan mood", 0.6)
         cluster_labels = {}
         used_names = {}
         
@@ -151,35 +1042,624 @@ class MusicMLEngine:
             
             cluster_labels[i] = final_name
 
+        self.cluster_labels = cluster_labels
         df['mood'] = df['cluster_id'].map(cluster_labels)
-        df['method'] = f"K-Means (k={n_clusters})"
-        df['display_title'] = df['song'] + " - " + df['artist']
+        df['rule_mood'] = _label_moods(df['valence'], df['energy'])
+        method_name = "Histogram K-Means" if algorithm == "histogram" else "K-Means"
+        self.run_info = {
+            "method": method_name,
+            "algorithm": algorithm,
+            "n_clusters": n_clusters,
+            "bins": bins if algorithm == "histogram" else None,
+            "label": f"{method_name} (k={n_clusters})",
+        }
+        self._metrics.lap("labelling")
         
         self.processed_data = df
+        report("Membangun indeks", 0.75)
+        self._build_indexes()
+        # Indeks n-gram pencarian dibangun saat pencarian pertama (_ensure_search_index)
+        self._search_index = None
+        self._metrics.lap("lookup_index")
+        # KD-tree lagu serupa dibangun saat pertama diminta (get_similar_songs)
+        self._similarity = None
+        report("Menyusun ringkasan", 0.95)
+        self.summary = self._build_summary()
+        self._metrics.lap("summary")
+        report("Selesai", 1.0)
         return "Sukses"
 
+    def _build_summary(self):
+        """
+        Agregat untuk halaman dashboard agar rerun tidak menghitung ulang dari seluruh data:
+        jumlah per cluster/mood, statistik centroid, rata-rata & kuantil valence/energy
+        per mood, crosstab genre x mood, dan daftar opsi mood.
+        """
+        self._ensure_indexes()
+        df = self.processed_data
+        mood_counts = df['mood'].value_counts()
+        cluster_counts = df['cluster_id'].value_counts().sort_index()
+        # Sama dengan df['mood'].mode()[0]: jumlah terbanyak, seri dipecah berdasarkan nama
+        dominant_mood = min(mood_counts[mood_counts == mood_counts.max()].index) if len(mood_counts) else None
+
+        centroid_stats = pd.DataFrame(self.centroids, columns=['valence', 'energy'])
+        centroid_stats.index.name = 'cluster_id'
+        centroid_stats['mood'] = centroid_stats.index.map(self.cluster_labels)
+        centroid_stats['count'] = cluster_counts.reindex(centroid_stats.index, fill_value=0)
+
+        grouped = df.groupby('mood', observed=True)[['valence', 'energy']]
+        mood_stats = grouped.mean().add_suffix('_mean')
+        quantiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+        quantiles.columns = [f"{col}_q{int(q * 100)}" for col, q in quantiles.columns]
+        mood_stats = mood_stats.join(quantiles)
+
+        genre_mood = pd.crosstab(df['genre'], df['mood']) if 'genre' in df.columns else None
+
+        return {
+            "total": len(df),
+            "method": self.run_info["label"] if self.run_info else None,
+            "n_clusters": int((cluster_counts > 0).sum()),
+            "dominant_mood": dominant_mood,
+            "mood_counts": mood_counts,
+            "cluster_counts": cluster_counts,
+            "centroid_stats": centroid_stats,
+            "mood_stats": mood_stats,
+            "genre_mood": genre_mood,
+            # Urutan kemunculan pertama, sama seperti df['mood'].unique()
+            "mood_options": sorted(self._mood_rows, key=lambda m: self._mood_rows[m][0]),
+        }
+
+    def get_summary(self):
+        """Ringkasan dashboard hasil clustering (dibangun saat pertama diminta setelah load_model)."""
+        if self.processed_data is None: return None
+        if self.summary is None:
+            self.summary = self._build_summary()
+        return self.summary
+
+    @_instrumented
+    def get_mood_agreement(self):
+        """
+        Matriks kesesuaian mood cluster (baris) vs mood aturan (kolom), dihitung vektor
+        dengan bincount, plus proporsi lagu yang mood cluster-nya sama dengan aturan.
+        """
+        if self.processed_data is None: return None
+        df = self.processed_data
+        cluster_codes, cluster_moods = pd.factorize(df['mood'], sort=True)
+        rule = pd.Categorical(df['rule_mood'], categories=MOOD_NAMES)
+        n_rule = len(MOOD_NAMES)
+        counts = np.bincount(cluster_codes * n_rule + rule.codes, minlength=len(cluster_moods) * n_rule)
+        matrix = pd.DataFrame(counts.reshape(len(cluster_moods), n_rule), index=cluster_moods, columns=MOOD_NAMES)
+        matrix.index.name = 'mood'
+        matrix.columns.name = 'rule_mood'
+
+        # Nama dasar mood cluster ("Happy 2" -> "Happy") untuk menghitung kecocokan
+        base_names = [m.rsplit(" ", 1)[0] if m.rsplit(" ", 1)[-1].isdigit() else m for m in cluster_moods]
+        matched = sum(matrix.at[m, base] for m, base in zip(cluster_moods, base_names) if base in MOOD_NAMES)
+        return {"matrix": matrix, "agreement_rate": matched / max(len(df), 1)}
+
+    @_instrumented
+    def get_scatter_payload(self, max_points=SCATTER_SAMPLE_POINTS, bins=SCATTER_DENSITY_BINS):
+        """
+        Data peta persebaran yang ukurannya tidak bergantung pada ukuran katalog:
+        density 2-D valence/energy per mood (grid `bins` x `bins`, dihitung dengan satu
+        bincount) dan sampel terstratifikasi per mood (maksimal `max_points` titik,
+        seed tetap) untuk titik yang bisa di-hover.
+        """
+        if self.processed_data is None: return None
+        self._ensure_indexes()
+        df = self.processed_data
+        moods = sorted(self._mood_rows)
+
+        # Density per mood: indeks sel grid + kode mood -> satu bincount
+        mood_codes = pd.Categorical(df['mood'], categories=moods).codes.astype(np.int64)
+        cells = np.clip((df[['valence', 'energy']].to_numpy(dtype=np.float64) * bins).astype(np.int64), 0, bins - 1)
+        valid = (mood_codes >= 0) & np.isfinite(df['valence'].to_numpy(dtype=np.float64)) \
+            & np.isfinite(df['energy'].to_numpy(dtype=np.float64))
+        flat = (mood_codes * bins + cells[:, 1]) * bins + cells[:, 0]
+        counts = np.bincount(flat[valid], minlength=len(moods) * bins * bins).reshape(len(moods), bins, bins)
+        density = {mood: counts[i] for i, mood in enumerate(moods)}
+
+        # Sampel terstratifikasi: kuota sebanding ukuran mood, minimal 1 titik per mood
+        rng = np.random.default_rng(42)
+        total = len(df)
+        picked = []
+        for mood in moods:
+            rows = self._mood_rows[mood]
+            quota = min(len(rows), max(1, int(round(max_points * len(rows) / max(total, 1)))))
+            picked.append(rows if quota == len(rows) else rng.choice(rows, size=quota, replace=False))
+        positions = np.sort(np.concatenate(picked)) if picked else np.array([], dtype=np.int64)
+
+        return {
+            "sample": df.take(positions),
+            "density": density,
+            "edges": np.linspace(0, 1, bins + 1),
+            "total": total,
+        }
+
+    @_instrumented
+    def predict_moods(self, valence, energy):
+        """
+        Prediksi cluster & mood untuk array valence/energy dengan model terlatih, tanpa
+        menyentuh katalog: satu transform scaler + satu pass nearest-centroid.
+        Mengembalikan {"cluster_id", "mood", "rule_mood"} (array numpy), atau None jika
+        model belum dilatih.
+        """
+        if self._centers is None or self.scaler is None: return None
+        features = pd.DataFrame({"valence": np.asarray(valence, dtype=np.float64),
+                                 "energy": np.asarray(energy, dtype=np.float64)})
+        if len(features) == 0:
+            clusters = np.array([], dtype=np.int64)
+        else:
+            X = self.scaler.transform(features)
+            clusters = pairwise_distances_argmin(X, self._centers)
+        mood_names = np.array([self.cluster_labels[i] for i in range(len(self._centers))], dtype=object)
+        return {
+            "cluster_id": clusters,
+            "mood": mood_names[clusters],
+            "rule_mood": np.asarray(_label_moods(features["valence"], features["energy"]), dtype=object),
+        }
+
+    @_instrumented
+    def append_songs(self, new_rows, online=False):
+        """
+        Tambahkan batch lagu baru tanpa training ulang: fitur di-scale dengan scaler
+        tersimpan, label diberikan lewat satu prediksi nearest-centroid, lalu batch
+        ditambahkan ke processed_data (dan raw_data). Dengan online=True, centroid
+        ikut diperbarui seperti mini-batch K-Means (rata-rata berjalan per cluster).
+        Laporan berisi `refit_recommended` beserta alasannya.
+        """
+        if self.processed_data is None or self._centers is None:
+            return {"success": False, "message": "Model belum dilatih. Jalankan clustering terlebih dahulu."}
+
+        batch = new_rows if isinstance(new_rows, pd.DataFrame) else pd.DataFrame(new_rows)
+        batch = batch.copy(deep=False)
+        original_cols = list(batch.columns)
+        batch.columns = [c.lower() for c in batch.columns]
+        required_cols = ['artist', 'song', 'valence', 'energy']
+        if not all(col in batch.columns for col in required_cols):
+            return {"success": False, "message": "Kolom wajib tidak lengkap (artist, song, valence, energy)"}
+        if len(batch) == 0:
+            return {"success": False, "message": "Batch kosong."}
+        if batch[['valence', 'energy']].isna().any().any():
+            return {"success": False, "message": "Nilai valence/energy tidak boleh kosong."}
+
+        X = self.scaler.transform(batch[['valence', 'energy']])
+        clusters = pairwise_distances_argmin(X, self._centers)
+        self._metrics.lap("predict")
+
+        if online:
+            # Update centroid per cluster: c_j <- (n_j * c_j + sum x) / (n_j + m_j)
+            k = len(self._centers)
+            batch_counts = np.bincount(clusters, minlength=k)
+            sums = np.zeros_like(self._centers)
+            np.add.at(sums, clusters, X)
+            totals = self._cluster_sizes + batch_counts
+            moved = batch_counts > 0
+            self._centers[moved] = (self._centers[moved] * self._cluster_sizes[moved, None] + sums[moved]) \
+                / totals[moved, None]
+            self._cluster_sizes = totals
+            self.centroids = self.scaler.inverse_transform(self._centers)
+        else:
+            self._cluster_sizes = self._cluster_sizes + np.bincount(clusters, minlength=len(self._centers))
+
+        batch['cluster_id'] = clusters
+        batch['mood'] = batch['cluster_id'].map(self.cluster_labels)
+        batch['rule_mood'] = _label_moods(batch['valence'], batch['energy'])
+
+        self._ensure_indexes()
+        start = len(self.processed_data)
+        self.processed_data = _concat_chunks([self.processed_data, _align_batch(batch, self.processed_data)])
+        self._metrics.lap("concat")
+        self._build_indexes(start)
+        self._metrics.lap("search_index")
+        # KD-tree tidak bisa ditambah per baris: bangun ulang saat lagu serupa diminta
+        self._similarity = None
+
+        # Data mentah ikut bertambah agar training ulang mencakup lagu baru
+        raw_batch = batch[[c.lower() for c in original_cols]]
+        raw_batch.columns = original_cols
+        raw_names = {c.lower(): c for c in self.raw_data.columns}
+        raw_batch = raw_batch.rename(columns=lambda c: raw_names.get(c.lower(), c))
+        self.raw_data = _concat_chunks([self.raw_data, _align_batch(raw_batch, self.raw_data)])
+        self._metrics.lap("concat_raw")
+        # Data tidak lagi sama dengan file upload / hasil sweep
+        self.data_hash = None
+        self._cache_key = None
+        self._sweep = None
+
+        # Evaluasi apakah training ulang penuh disarankan
+        self._fit_info["appended"] += len(batch)
+        reasons = []
+        growth = self._fit_info["appended"] / max(self._fit_info["rows"], 1)
+        if growth > REFIT_GROWTH_RATIO:
+            reasons.append(f"{self._fit_info['appended']} lagu baru sejak training ({growth:.0%} dari data training)")
+        out_of_range = np.mean(((X < 0) | (X > 1)).any(axis=1))
+        if out_of_range > REFIT_OUT_OF_RANGE:
+            reasons.append(f"{out_of_range:.1%} lagu baru di luar rentang scaler")
+        inertia_per_row = np.mean(np.sum((X - self._centers[clusters]) ** 2, axis=1))
+        if self._fit_info["inertia_per_row"] > 0 and \
+                inertia_per_row > REFIT_INERTIA_RATIO * self._fit_info["inertia_per_row"]:
+            reasons.append("lagu baru jauh dari centroid yang ada")
+        centroid_shift = float(np.max(np.linalg.norm(self._centers - self._fit_info["centers"], axis=1)))
+        if centroid_shift > REFIT_CENTROID_SHIFT:
+            reasons.append(f"centroid bergeser {centroid_shift:.3f} sejak training")
+
+        self.summary = self._build_summary()
+
+        counts = pd.Series(clusters).map(self.cluster_labels).value_counts()
+        return {
+            "success": True,
+            "appended": len(batch),
+            "total": len(self.processed_data),
+            "mood_counts": counts.to_dict(),
+            "centroid_shift": centroid_shift,
+            "refit_recommended": bool(reasons),
+            "refit_reasons": reasons,
+            "message": f"Berhasil menambahkan {len(batch)} lagu."
+        }
+
+    def _build_indexes(self, start=0):
+        """
+        Bangun indeks posisi baris untuk processed_data: hash judul -> baris (get_song_details)
+        serta mood/genre -> baris (filter). Dengan
+        start > 0 hanya baris mulai `start` yang diindeks dan digabung ke indeks lama,
+        termasuk indeks n-gram jika sudah pernah dibangun (lihat _ensure_search_index).
+        """
+        df = self.processed_data.iloc[start:]
+        hashes = _title_hashes(df)
+        positions = np.arange(start, start + len(df), dtype=np.int32)
+        if start > 0 and self._title_index is not None:
+            hashes = np.concatenate((self._title_index[0], hashes))
+            positions = np.concatenate((self._title_index[1], positions))
+        # Stabil: hash sama (judul kembar) tetap berurutan posisi, jadi baris pertama didahulukan
+        order = np.argsort(hashes, kind="stable")
+        self._title_index = (hashes[order], positions[order])
+        mood_rows = {mood: rows + start for mood, rows in df.groupby('mood', sort=False, observed=True).indices.items()}
+        genre_rows = None
+        if 'genre' in df.columns:
+            genre_rows = {genre: rows + start
+                          for genre, rows in df.groupby('genre', sort=False, observed=True).indices.items()}
+
+        if start == 0:
+            self._mood_rows = mood_rows
+            self._genre_rows = genre_rows
+        else:
+            if self._search_index is not None:
+                self._search_index = _merge_rows(self._search_index, self._ngram_index(start))
+            self._mood_rows = _merge_rows(self._mood_rows, mood_rows)
+            if genre_rows is not None:
+                self._genre_rows = _merge_rows(self._genre_rows or {}, genre_rows)
+
+    def _ensure_indexes(self):
+        """Bangun indeks mood/genre jika belum ada (misal setelah load_model)."""
+        if self.processed_data is not None and self._mood_rows is None:
+            self._build_indexes()
+
+    def _ngram_index(self, start=0):
+        # Judul lowercase hanya sementara selama indeks dibangun, tidak disimpan
+        titles = display_titles(self.processed_data.iloc[start:]).str.lower()
+        return _build_ngram_index(titles, offset=start)
+
+    def _ensure_search_index(self):
+        """
+        Indeks n-gram judul dibangun saat pertama dibutuhkan (pencarian atau save_model),
+        bukan saat clustering; setelah load_model indeks tersimpan dipakai ulang.
+        """
+        if self._search_index is None:
+            self._search_index = self._ngram_index()
+            self._metrics.lap("search_index")
+
+    def _search_positions(self, query):
+        """Posisi baris (terurut) yang judul "song - artist"-nya mengandung `query` (case-insensitive, literal)."""
+        query = query.lower()
+        self._ensure_search_index()
+        if len(query) < SEARCH_NGRAM:
+            # Judul selalu >= 3 karakter (" - "), jadi judul memuat query pendek tepat jika
+            # salah satu n-gramnya memuat query: gabungkan posting n-gram tersebut
+            mask = np.zeros(len(self.processed_data), dtype=bool)
+            for gram, rows in self._search_index.items():
+                if query in gram:
+                    mask[rows] = True
+            return np.flatnonzero(mask)
+
+        grams = {query[i:i + SEARCH_NGRAM] for i in range(len(query) - SEARCH_NGRAM + 1)}
+        postings = [self._search_index.get(gram) for gram in grams]
+        if any(rows is None for rows in postings):
+            return np.array([], dtype=np.int64)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for rows in postings[1:]:
+            # Kandidat sudah sedikit: lebih murah diverifikasi langsung daripada
+            # di-intersect dengan posting besar (misal " - " yang ada di semua judul)
+            if len(candidates) <= SEARCH_VERIFY_ROWS:
+                break
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+        # Semua n-gram cocok belum tentu berurutan (atau berulang, misal "aaaa" vs "aaab"):
+        # verifikasi substring hanya pada kandidat (judul dibentuk hanya untuk baris kandidat)
+        if len(query) > SEARCH_NGRAM:
+            titles = display_titles(self.processed_data.iloc[candidates]).str.lower()
+            mask = titles.str.contains(query, regex=False, na=False).to_numpy()
+            candidates = candidates[mask]
+        return candidates
+
+    def _title_position(self, display_title):
+        """
+        Posisi baris pertama dengan judul persis `display_title` lewat indeks hash (song, artist):
+        setiap pemisah " - " dicoba sebagai batas song/artist, lalu hit diverifikasi ke judul asli.
+        """
+        self._ensure_indexes()
+        hashes, positions = self._title_index
+        songs, artists = self.processed_data['song'], self.processed_data['artist']
+        best = None
+        split = display_title.find(" - ")
+        while split != -1:
+            song, artist = display_title[:split], display_title[split + 3:]
+            key = _title_hash(song, artist)
+            lo, hi = np.searchsorted(hashes, key, side="left"), np.searchsorted(hashes, key, side="right")
+            for pos in positions[lo:hi]:
+                if (best is None or pos < best) and songs.iat[pos] == song and artists.iat[pos] == artist:
+                    # Posisi dalam satu hash terurut, jadi kecocokan pertama adalah baris terawal
+                    best = int(pos)
+                    break
+            split = display_title.find(" - ", split + 1)
+        return best
+
+    @_instrumented
+    def compare_clustering_engines(self, n_clusters, bins=HIST_BINS, sample_size=200_000):
+        """
+        Laporan akurasi engine histogram terhadap K-Means exact pada data yang sama
+        (sampel acak ber-seed jika data lebih besar dari `sample_size`).
+        """
+        if self.raw_data is None: return None
+        df = self.raw_data.copy(deep=False)
+        df.columns = [c.lower() for c in df.columns]
+        if not all(col in df.columns for col in ['valence', 'energy']):
+            return None
+        if sample_size and len(df) > sample_size:
+            df = df.sample(n=sample_size, random_state=42)
+
+        X_scaled = MinMaxScaler().fit_transform(df[['valence', 'energy']])
+
+        start = time.perf_counter()
+        exact, exact_labels = _fit_kmeans(X_scaled, n_clusters, "kmeans")
+        time_exact = time.perf_counter() - start
+        start = time.perf_counter()
+        hist, hist_labels = _fit_kmeans(X_scaled, n_clusters, "histogram", bins)
+        time_hist = time.perf_counter() - start
+
+        # Pasangkan centroid histogram ke centroid exact (assignment dengan jarak minimum)
+        dist = np.linalg.norm(exact.cluster_centers_[:, None, :] - hist.cluster_centers_[None, :, :], axis=2)
+        exact_idx, hist_idx = linear_sum_assignment(dist)
+        mapping = np.empty(n_clusters, dtype=np.int64)
+        mapping[hist_idx] = exact_idx
+
+        inertia_exact = exact.inertia_
+        inertia_hist = -hist.score(X_scaled)
+        return {
+            "n_rows": len(X_scaled),
+            "bins": bins,
+            "adjusted_rand_index": float(adjusted_rand_score(exact_labels, hist_labels)),
+            "label_agreement": float(np.mean(mapping[hist_labels] == exact_labels)),
+            "max_centroid_shift": float(dist[exact_idx, hist_idx].max()),
+            "inertia_exact": float(inertia_exact),
+            "inertia_histogram": float(inertia_hist),
+            "inertia_ratio": float(inertia_hist / inertia_exact) if inertia_exact else 1.0,
+            "time_exact": time_exact,
+            "time_histogram": time_hist,
+        }
+
+    @_instrumented
     def get_filtered_data(self, genre="All", mood="All"):
         if self.processed_data is None: return pd.DataFrame()
-        df = self.processed_data.copy()
-        if genre != "All" and 'genre' in df.columns:
-            df = df[df['genre'] == genre]
+        self._ensure_indexes()
+        empty = np.array([], dtype=np.int64)
+        positions = None
+        if genre != "All" and self._genre_rows is not None:
+            positions = self._genre_rows.get(genre, empty)
         if mood != "All":
-            df = df[df['mood'] == mood]
-        return df
+            mood_rows = self._mood_rows.get(mood, empty)
+            positions = mood_rows if positions is None else np.intersect1d(positions, mood_rows, assume_unique=True)
+        if positions is None:
+            return self.processed_data
+        return self.processed_data.take(positions)
 
+    @_instrumented
     def search_songs(self, query, mood_filter="All"):
         if self.processed_data is None: return pd.DataFrame()
-        df = self.processed_data.copy()
-        mask = pd.Series([True] * len(df))
+        self._ensure_indexes()
+        positions = None
         if query:
-            mask &= df['display_title'].str.contains(query, case=False, na=False)
+            positions = self._search_positions(query)
         if mood_filter != "All":
-            mask &= df['mood'] == mood_filter
-        return df[mask]
+            mood_rows = self._mood_rows.get(mood_filter, np.array([], dtype=np.int64))
+            positions = mood_rows if positions is None else np.intersect1d(positions, mood_rows, assume_unique=True)
+        if positions is None:
+            return self.processed_data
+        return self.processed_data.take(positions)
 
+    @_instrumented
     def get_song_details(self, display_title):
         if self.processed_data is None: return None
+        self._ensure_indexes()
+        pos = self._title_position(display_title)
+        if pos is None:
+            return None
+        return self.processed_data.iloc[pos]
+
+    def _build_similarity_index(self):
+        """
+        KD-tree atas fitur audio yang di-scale ke 0-1 (nilai kosong diisi median),
+        sehingga pencarian lagu serupa O(log n) per query, bukan scan seluruh katalog.
+        Fitur opsional yang bukan angka atau kosong seluruhnya tidak dipakai.
+        """
+        df = self.processed_data
+        features = [c for c in SIMILARITY_FEATURES if c in df.columns and
+                    (c in ('valence', 'energy') or
+                     (pd.api.types.is_numeric_dtype(df[c]) and df[c].notna().any()))]
+        values = df[features].astype(np.float64)
+        values = values.fillna(values.median())
+        X = MinMaxScaler().fit_transform(values)
+        self._similarity = {"features": features, "X": X, "tree": KDTree(X), "mood_trees": {}}
+
+    def _mood_tree(self, mood):
+        """KD-tree khusus satu mood (dibangun saat pertama diminta): (tree, posisi baris)."""
+        mood_trees = self._similarity["mood_trees"]
+        if mood not in mood_trees:
+            rows = self._mood_rows.get(mood, np.array([], dtype=np.int64))
+            mood_trees[mood] = (KDTree(self._similarity["X"][rows]), rows)
+        return mood_trees[mood]
+
+    @_instrumented
+    def get_similar_songs(self, display_title, k=10, same_mood=False):
+        """
+        `k` lagu paling mirip dengan `display_title` berdasarkan jarak Euclidean pada fitur
+        audio ter-scale (valence, energy, serta danceability/acousticness jika ada).
+        Dengan same_mood=True hanya lagu dengan mood yang sama yang dipertimbangkan.
+        Hasil berurutan dari yang paling mirip dengan kolom tambahan `distance`.
+        """
+        if self.processed_data is None: return pd.DataFrame()
+        self._ensure_indexes()
+        pos = self._title_position(display_title)
+        if pos is None:
+            return pd.DataFrame()
+        if self._similarity is None:
+            self._build_similarity_index()
+
+        if same_mood:
+            tree, rows = self._mood_tree(self.processed_data['mood'].iloc[pos])
+        else:
+            tree, rows = self._similarity["tree"], None
+        # +1 karena lagu itu sendiri ikut ditemukan (jarak 0)
+        n_query = min(k + 1, tree.data.shape[0])
+        dist, idx = tree.query(self._similarity["X"][pos:pos + 1], k=n_query)
+        dist, idx = dist[0], idx[0]
+        if rows is not None:
+            idx = rows[idx]
+        keep = idx != pos
+        positions, dist = idx[keep][:k], dist[keep][:k]
+        result = self.processed_data.take(positions)
+        return result.assign(distance=dist)
+
+    @_instrumented
+    def save_model(self, directory):
+        """
+        Simpan engine yang sudah dilatih ke `directory`: katalog processed_data sebagai
+        Feather tanpa kompresi (agar bisa di-memory-map) dan state model (scaler,
+        centroid, label mood, metrik) sebagai file joblib kecil.
+
+        Katalog & indeks ditulis dengan nama berversi baru, lalu file state (yang menunjuk
+        ke keduanya) ditukar paling akhir secara atomik: pembaca selalu mendapat pasangan
+        state/katalog/indeks dari save yang sama. Versi sebelumnya disimpan satu generasi
+        untuk pembaca yang sedang berjalan, versi yang lebih lama dihapus.
+        """
+        if self.processed_data is None or self.model is None:
+            return {"success": False, "message": "Model belum dilatih. Jalankan clustering terlebih dahulu."}
+        try:
+            os.makedirs(directory, exist_ok=True)
+            state_path = os.path.join(directory, STATE_FILE)
+            previous = _model_files(joblib.load(state_path)) if os.path.exists(state_path) else {}
+            token = uuid.uuid4().hex[:12]
+            files = {"catalog": _versioned_name(CATALOG_FILE, token),
+                     "search_index": _versioned_name(SEARCH_INDEX_FILE, token)}
+            # Tulis ke file sementara lalu rename, agar pembaca tidak melihat file setengah jadi
+            catalog_path = os.path.join(directory, files["catalog"])
+            self.processed_data.reset_index(drop=True).to_feather(catalog_path + ".tmp", compression="uncompressed")
+            os.replace(catalog_path + ".tmp", catalog_path)
+            self._metrics.lap("catalog")
+            state = {
+                "version": MODEL_FORMAT_VERSION,
+                "files": files,
+                "data_hash": self.data_hash,
+                "scaler": self.scaler,
+                "model": self.model,
+                "centroids": self.centroids,
+                "cluster_labels": self.cluster_labels,
+                "run_info": self.run_info,
+                "cluster_metrics": self.cluster_metrics,
+                "centers": self._centers,
+                "cluster_sizes": self._cluster_sizes,
+                "fit_info": self._fit_info,
+            }
+            # Indeks n-gram disimpan dalam bentuk CSR (kunci, offset, posisi) agar bisa di-mmap
+            self._ensure_search_index()
+            grams = list(self._search_index)
+            lengths = np.array([len(self._search_index[g]) for g in grams], dtype=np.int64)
+            offsets = np.concatenate(([0], np.cumsum(lengths)))
+            rows = np.concatenate([self._search_index[g] for g in grams]) if grams else np.array([], dtype=np.int32)
+            index_path = os.path.join(directory, files["search_index"])
+            joblib.dump({"grams": grams, "offsets": offsets, "rows": rows}, index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
+            self._metrics.lap("search_index")
+
+            # Titik commit: state baru menunjuk ke katalog & indeks yang sudah lengkap
+            joblib.dump(state, state_path + ".tmp")
+            os.replace(state_path + ".tmp", state_path)
+            self._metrics.lap("state")
+            _remove_stale_model_files(directory, keep=set(files.values()) | set(previous.values()))
+            return {"success": True, "message": f"Model disimpan ke {directory}."}
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+
+    @_instrumented
+    def load_model(self, directory):
+        """
+        Muat engine dari hasil save_model. Katalog dibaca dengan memory-map (pyarrow),
+        indeks pencarian/lookup baru dibangun saat pertama kali dipakai.
+        """
         try:
-            return self.processed_data[self.processed_data['display_title'] == display_title].iloc[0]
-        except IndexError:
-            return None
\ No newline at end of file
+            import pyarrow.feather as feather
+
+            for attempt in range(2):
+                state = joblib.load(os.path.join(directory, STATE_FILE))
+                if state.get("version") not in SUPPORTED_MODEL_VERSIONS:
+                    return {"success": False, "message": "Versi format model tidak didukung."}
+                files = _model_files(state)
+                try:
+                    table = feather.read_table(os.path.join(directory, files["catalog"]), memory_map=True)
+                    index = joblib.load(os.path.join(directory, files["search_index"]), mmap_mode="r")
+                    break
+                except FileNotFoundError:
+                    # Dua save lain selesai di antara baca state & katalog: baca state terbaru
+                    if attempt:
+                        raise
+            self._metrics.lap("state")
+            df = table.to_pandas(split_blocks=True)
+            run_info = state.get("run_info")
+            legacy_columns = [c for c in LEGACY_DERIVED_COLUMNS if c in df.columns]
+            if legacy_columns:
+                # Format v1: metode tersimpan per baris; ambil sekali lalu buang kolom turunan lama
+                if run_info is None and "method" in df.columns and len(df):
+                    run_info = {"label": df["method"].iloc[0]}
+                df = df.drop(columns=legacy_columns)
+            self._metrics.lap("catalog")
+            offsets, rows = index["offsets"], index["rows"]
+            search_index = {gram: rows[offsets[i]:offsets[i + 1]] for i, gram in enumerate(index["grams"])}
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+
+        self.processed_data = df
+        # Data mentah = katalog tanpa kolom turunan (tanpa salinan data)
+        self.raw_data = df[[c for c in df.columns if c not in DERIVED_COLUMNS]]
+        self.data_hash = state["data_hash"]
+        self._cache_key = None
+        self.load_stats = {}
+        self._sweep = None
+        self.scaler = state["scaler"]
+        self.model = state["model"]
+        self.reused_sweep_fit = False
+        self.centroids = state["centroids"]
+        self.cluster_labels = state["cluster_labels"]
+        self.run_info = run_info
+        self.cluster_metrics = state["cluster_metrics"]
+        self._centers = state["centers"]
+        self._cluster_sizes = state["cluster_sizes"]
+        self._fit_info = state["fit_info"]
+        self._search_index = search_index
+        self._title_index = None
+        self._mood_rows = None
+        self._genre_rows = None
+        self._similarity = None
+        self.summary = None
+        return {"success": True, "message": f"Berhasil memuat model dengan {len(df)} lagu."}
\ No newline at end of file
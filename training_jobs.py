@@ -0,0 +1,107 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Jumlah job training yang boleh berjalan bersamaan di satu proses Streamlit
+DEFAULT_MAX_WORKERS = 2
+
+
+class TrainingCancelled(Exception):
+    """Dilempar dari callback progress saat job diminta berhenti."""
+
+
+class _Job:
+    def __init__(self, job_id, label):
+        self.id = job_id
+        self.label = label
+        self.state = "queued"       # queued -> running -> done | failed | cancelled
+        self.stage = "Menunggu antrian"
+        self.fraction = 0.0
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def report(self, stage, fraction):
+        """Callback progress untuk engine; juga titik pembatalan kooperatif."""
+        if self.cancel_event.is_set():
+            raise TrainingCancelled(stage)
+        self.stage = stage
+        self.fraction = min(max(float(fraction), 0.0), 1.0)
+
+
+class TrainingJobManager:
+    """
+    Menjalankan training / k-sweep di thread latar agar halaman Streamlit tetap
+    responsif. Fungsi job menerima keyword `progress` (callback tahap, fraksi);
+    halaman cukup mem-poll `status(job_id)` lalu rerun sampai job selesai.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="training")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, fn, *args, label="", **kwargs):
+        """Jadwalkan `fn(*args, progress=..., **kwargs)`; kembalikan id job."""
+        with self._lock:
+            job = _Job(next(self._ids), label)
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.state = "cancelled"
+            job.finished = time.time()
+            return
+        job.state = "running"
+        job.started = time.time()
+        try:
+            job.result = fn(*args, progress=job.report, **kwargs)
+            job.state = "done"
+            job.fraction = 1.0
+        except TrainingCancelled:
+            job.state = "cancelled"
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+        finally:
+            job.finished = time.time()
+
+    def status(self, job_id):
+        """Snapshot status job, atau None jika id tidak dikenal."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        end = job.finished or time.time()
+        return {
+            "id": job.id,
+            "label": job.label,
+            "state": job.state,
+            "stage": job.stage,
+            "fraction": job.fraction,
+            "result": job.result,
+            "error": job.error,
+            "elapsed": end - job.started if job.started else 0.0,
+            "cancel_requested": job.cancel_event.is_set(),
+        }
+
+    def cancel(self, job_id):
+        """Minta job berhenti di tahap berikutnya; job antrian langsung dibatalkan."""
+        job = self._jobs.get(job_id)
+        if job is None or job.state in ("done", "failed", "cancelled"):
+            return False
+        job.cancel_event.set()
+        return True
+
+    def forget(self, job_id):
+        """Hapus job yang sudah selesai dari daftar (dipanggil setelah hasilnya dibaca)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.state in ("done", "failed", "cancelled"):
+                del self._jobs[job_id]